@@ -0,0 +1,210 @@
+"""
+Goal analytics: completion, on-time and cancellation rates per manager (team)
+and per employee, by due-date quarter, plus quarter-over-quarter trends.
+
+Metrics are computed with vectorized pandas/NumPy over chunked extracts from
+server-side cursors and persisted in the goal_rollups table. Refreshes are
+incremental: only users whose goals changed since the last watermark
+(goals.updated_at, plus deletions and reassignments logged in
+goal_analytics_changes) are recomputed. The dashboard reads goal_rollups
+instead of scanning goals.
+
+Usage:
+    python analytics.py refresh          # incremental, e.g. from cron every few minutes
+    python analytics.py refresh --full   # recompute everything
+"""
+import argparse
+import sys
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+import backend as db
+
+WATERMARK_NAME = 'goal_rollups'
+
+# Re-scan this far behind the watermark so rows committed by transactions that
+# were still open at the previous refresh are not missed. Recomputing is idempotent.
+WATERMARK_OVERLAP = '5 minutes'
+
+CHUNK_SIZE = 100_000
+
+SCOPE_COLUMNS = {'Manager': 'manager_id', 'Employee': 'employee_id'}
+
+COUNT_COLUMNS = ['total_goals', 'completed_goals', 'completed_on_time', 'completed_with_date', 'cancelled_goals']
+ROLLUP_COLUMNS = ['user_id', 'quarter'] + COUNT_COLUMNS + ['completion_rate', 'on_time_rate', 'cancellation_rate']
+
+
+def _touched_users(cur, since) -> Dict[str, List[int]]:
+    """Returns the manager and employee ids whose goals changed after `since`."""
+    cur.execute("""
+        SELECT manager_id, employee_id FROM goals
+        WHERE updated_at > %(since)s::timestamptz - %(overlap)s::interval
+        UNION
+        SELECT manager_id, employee_id FROM goal_analytics_changes
+        WHERE changed_at > %(since)s::timestamptz - %(overlap)s::interval;
+    """, {'since': since, 'overlap': WATERMARK_OVERLAP})
+    rows = cur.fetchall()
+    return {
+        'Manager': sorted({m for m, _ in rows if m is not None}),
+        'Employee': sorted({e for _, e in rows if e is not None}),
+    }
+
+
+def _extract(conn, scope: str, user_ids: Optional[List[int]], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Streams (user_id, quarter, status, due_date, completed_on) for the scope's goals."""
+    column = SCOPE_COLUMNS[scope]
+    where = f"{column} IS NOT NULL AND due_date IS NOT NULL"
+    params = {}
+    if user_ids is not None:
+        where += f" AND {column} = ANY(%(user_ids)s)"
+        params['user_ids'] = user_ids
+    with conn.cursor(name=f"analytics_{uuid.uuid4().hex}") as cur:
+        cur.itersize = chunk_size
+        cur.execute(f"""
+            SELECT {column} AS user_id, date_trunc('quarter', due_date)::date AS quarter,
+                   status, due_date, completed_at::date AS completed_on
+            FROM goals
+            WHERE {where};
+        """, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=['user_id', 'quarter', 'status', 'due_date', 'completed_on'])
+
+
+def aggregate_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Reduces one extract chunk to summed counts per (user_id, quarter)."""
+    status = chunk['status'].to_numpy()
+    completed = status == 'Completed'
+    due = pd.to_datetime(chunk['due_date']).to_numpy(dtype='datetime64[D]')
+    completed_on = pd.to_datetime(chunk['completed_on']).to_numpy(dtype='datetime64[D]')
+    has_date = completed & ~np.isnat(completed_on)
+
+    counts = pd.DataFrame({
+        'user_id': chunk['user_id'].to_numpy(),
+        'quarter': chunk['quarter'].to_numpy(),
+        'total_goals': np.ones(len(chunk), dtype=np.int64),
+        'completed_goals': completed.astype(np.int64),
+        'completed_on_time': (has_date & (completed_on <= due)).astype(np.int64),
+        'completed_with_date': has_date.astype(np.int64),
+        'cancelled_goals': (status == 'Cancelled').astype(np.int64),
+    })
+    return counts.groupby(['user_id', 'quarter'], sort=False).sum()
+
+
+def compute_rollups(chunks: Iterator[pd.DataFrame]) -> pd.DataFrame:
+    """Combines per-chunk partial counts and derives the rates."""
+    partials = [aggregate_chunk(chunk) for chunk in chunks]
+    if not partials:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    totals = pd.concat(partials).groupby(level=['user_id', 'quarter']).sum().reset_index()
+
+    total = totals['total_goals'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        totals['completion_rate'] = totals['completed_goals'] / total
+        totals['cancellation_rate'] = totals['cancelled_goals'] / total
+        # Goals completed before completed_at was tracked have no date and are left out.
+        with_date = totals['completed_with_date'].where(totals['completed_with_date'] > 0)
+        totals['on_time_rate'] = totals['completed_on_time'] / with_date
+    return totals[ROLLUP_COLUMNS]
+
+
+def _write_rollups(cur, scope: str, user_ids: Optional[List[int]], rollups: pd.DataFrame):
+    if user_ids is None:
+        cur.execute("DELETE FROM goal_rollups WHERE scope = %s;", (scope,))
+    else:
+        cur.execute("DELETE FROM goal_rollups WHERE scope = %s AND user_id = ANY(%s);", (scope, user_ids))
+    if rollups.empty:
+        return
+    values = rollups.astype(object).where(rollups.notna(), None)
+    rows = [(scope,) + tuple(row) for row in values.itertuples(index=False, name=None)]
+    execute_values(
+        cur,
+        f"INSERT INTO goal_rollups (scope, {', '.join(ROLLUP_COLUMNS)}) VALUES %s;",
+        rows,
+        page_size=5000
+    )
+
+
+def refresh(full: bool = False, chunk_size: int = CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Recomputes rollups for users touched since the last watermark (or all of
+    them with `full`) in one transaction. Returns the number of users refreshed per scope.
+    """
+    with db.db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (WATERMARK_NAME,))
+        cur.execute("SELECT CURRENT_TIMESTAMP;")
+        refresh_started = cur.fetchone()[0]
+        cur.execute("SELECT watermark FROM analytics_watermarks WHERE name = %s;", (WATERMARK_NAME,))
+        row = cur.fetchone()
+
+        if full or row is None:
+            touched = {'Manager': None, 'Employee': None}
+        else:
+            touched = _touched_users(cur, row[0])
+
+        refreshed = {}
+        tags = []
+        for scope, user_ids in touched.items():
+            if user_ids is not None and not user_ids:
+                refreshed[scope] = 0
+                continue
+            rollups = compute_rollups(_extract(conn, scope, user_ids, chunk_size))
+            _write_rollups(cur, scope, user_ids, rollups)
+            if user_ids is None:
+                refreshed[scope] = rollups['user_id'].nunique()
+                tags.append('*')
+            else:
+                refreshed[scope] = len(user_ids)
+                tags.extend(f"rollups:{scope}:{user_id}" for user_id in user_ids)
+
+        cur.execute("""
+            INSERT INTO analytics_watermarks (name, watermark) VALUES (%s, %s)
+            ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark;
+        """, (WATERMARK_NAME, refresh_started))
+        cur.execute(
+            "DELETE FROM goal_analytics_changes WHERE changed_at < %s::timestamptz - %s::interval;",
+            (refresh_started, WATERMARK_OVERLAP)
+        )
+        if tags:
+            db.invalidate_cache(cur, tags)
+        conn.commit()
+    return refreshed
+
+
+def quarter_over_quarter(rollups: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the change in each rate versus the user's previous quarter
+    (`*_change` columns) to a rollup frame.
+    """
+    if rollups.empty:
+        return rollups.assign(completion_rate_change=[], on_time_rate_change=[], cancellation_rate_change=[])
+    df = rollups.sort_values(['user_id', 'quarter'])
+    grouped = df.groupby('user_id', sort=False)
+    for column in ['completion_rate', 'on_time_rate', 'cancellation_rate']:
+        df[f"{column}_change"] = grouped[column].diff()
+    return df
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Refresh goal analytics rollups.")
+    parser.add_argument("command", choices=["refresh"])
+    parser.add_argument("--full", action="store_true", help="recompute every user instead of changed ones")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    refreshed = refresh(full=args.full, chunk_size=args.chunk_size)
+    print(f"Refreshed rollups for {refreshed['Manager']:,} managers and "
+          f"{refreshed['Employee']:,} employees in {time.monotonic() - started:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
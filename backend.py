@@ -1,326 +1,672 @@
+import atexit
+import contextvars
+import functools
+import itertools
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
 import psycopg2
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import streamlit as st
 
+import instrumentation
+import migrate
+from cache import InvalidationListener, ResultCache, publish_invalidation
+from instrumentation import InstrumentedCursor, instrumented
+from pool import ConnectionPool
+
 # Replace with your actual database credentials
 DB_HOST = "localhost"
+DB_PORT = 5432
 DB_NAME = "ePMS"
 DB_USER = "postgres"
 DB_PASSWORD = "Harry#17"
 
-def get_db_connection():
-    """Establishes and returns a connection to the PostgreSQL database."""
+# Connection pool settings (one pool per process, shared by all Streamlit sessions)
+DB_POOL_MIN_SIZE = 1
+DB_POOL_MAX_SIZE = 10
+DB_POOL_TIMEOUT = 10.0              # seconds to wait for a free connection
+DB_POOL_HEALTH_CHECK_AFTER = 30.0   # ping connections idle for longer than this
+DB_CONNECT_TIMEOUT = 5              # seconds for the TCP + auth handshake
+
+# Streaming replicas as (host, port) pairs; empty sends everything to the primary.
+# Read-only functions use a replica whose replay lag is within REPLICA_MAX_LAG_SECONDS,
+# except for a session that wrote within READ_YOUR_WRITES_SECONDS. Writes always use the primary.
+DB_REPLICA_HOSTS: List[Tuple[str, int]] = []
+REPLICA_MAX_LAG_SECONDS = 5.0
+REPLICA_LAG_CHECK_INTERVAL = 2.0    # seconds between lag probes of each replica
+REPLICA_RETRY_AFTER = 30.0          # seconds before probing an unreachable replica again
+READ_YOUR_WRITES_SECONDS = 10.0
+
+# Read-through result cache for the read functions (per process, shared by sessions).
+# Writes invalidate affected entries here and, through LISTEN/NOTIFY, in other processes.
+CACHE_ENABLED = True
+CACHE_TTL_SECONDS = 30.0
+CACHE_MAX_ENTRIES = 1024
+CACHE_CHANNEL = "epms_cache_invalidation"
+
+# Query timing: statements slower than this are logged to the "epms.slow_query" logger.
+# Set METRICS_PORT to serve Prometheus metrics on http://<host>:<port>/metrics.
+SLOW_QUERY_THRESHOLD_MS = 250
+METRICS_PORT = None
+
+# Read dashboard status counts from the trigger-maintained goal_status_counts table
+# instead of counting the user's goals on every render.
+USE_GOAL_SUMMARY = True
+
+GOAL_STATUSES = ['Draft', 'In Progress', 'Completed', 'Cancelled']
+
+# Goal column that links a user to a goal for each role
+ROLE_COLUMNS = {'Manager': 'manager_id', 'Employee': 'employee_id'}
+
+# Default number of rows per page for the keyset-paginated listings
+PAGE_SIZE = 50
+
+# Quarterly feedback partitions kept created ahead of the current quarter
+# (see migrations/0008_partition_feedback.sql and partitions.py)
+FEEDBACK_PARTITIONS_AHEAD = 4
+
+# Result kinds returned by search, in display order for equal ranks
+SEARCH_KINDS = ['goal', 'task', 'feedback']
+SEARCH_COLUMNS = ['kind', 'item_id', 'goal_id', 'goal_title', 'rank', 'snippet']
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_replica_pools: Dict[Tuple[str, int], ConnectionPool] = {}
+_replica_health: Dict[Tuple[str, int], Dict[str, Any]] = {}
+_replica_turn = itertools.count()
+_routing_lock = threading.Lock()
+_session_key = contextvars.ContextVar("epms_session_key", default=None)
+_last_writes: Dict[str, float] = {}  # session key -> time.monotonic() of its last write
+
+result_cache = ResultCache(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+_cache_listener = None
+_metrics_server = None
+
+instrumentation.configure(slow_query_ms=SLOW_QUERY_THRESHOLD_MS)
+
+def _connect(host: Optional[str] = None, port: Optional[int] = None):
+    """Opens a new raw connection to the primary (or the given) PostgreSQL server."""
+    return psycopg2.connect(
+        host=host or DB_HOST,
+        port=port or DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+        cursor_factory=InstrumentedCursor
+    )
+
+def get_pool() -> ConnectionPool:
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect,
+                    minconn=DB_POOL_MIN_SIZE,
+                    maxconn=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    health_check_after=DB_POOL_HEALTH_CHECK_AFTER
+                )
+                atexit.register(_pool.closeall)
+    return _pool
+
+def _replica_pool(replica: Tuple[str, int]) -> ConnectionPool:
+    """Returns the connection pool for a replica, creating it on first use."""
+    with _pool_lock:
+        pool = _replica_pools.get(replica)
+        if pool is None:
+            pool = _replica_pools[replica] = ConnectionPool(
+                functools.partial(_connect, *replica),
+                minconn=0,
+                maxconn=DB_POOL_MAX_SIZE,
+                timeout=DB_POOL_TIMEOUT,
+                health_check_after=DB_POOL_HEALTH_CHECK_AFTER
+            )
+            atexit.register(pool.closeall)
+    return pool
+
+def measure_replica_lag(replica: Tuple[str, int]) -> Optional[float]:
+    """
+    Returns a replica's replay lag in seconds (0 when it has replayed everything
+    it received), or None when it is unreachable, no longer a standby or not
+    streaming from the primary: a standby whose WAL receiver disconnected has
+    replayed all it received but falls further behind without showing any lag.
+    """
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        return conn
-    except psycopg2.OperationalError as e:
-        st.error(f"Error connecting to database: {e}")
+        with _replica_pool(replica).connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                    pg_is_in_recovery(),
+                    (SELECT status FROM pg_stat_wal_receiver),
+                    -- Caught up means no lag, however long ago the last transaction was
+                    -- (an idle primary). After a WAL receiver restart, e.g. once replay is
+                    -- resumed, the receive position restarts at a segment boundary and can
+                    -- sit behind the replay position, so compare with >= rather than =.
+                    CASE WHEN pg_last_wal_replay_lsn() >= pg_last_wal_receive_lsn() THEN 0
+                         ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                    END;
+            """)
+            in_recovery, receiver_status, lag = cur.fetchone()
+            conn.rollback()
+    except psycopg2.Error:
         return None
+    if not in_recovery or receiver_status != 'streaming':
+        return None
+    return float(lag or 0)
 
-def create_tables_and_insert_data():
+def _replica_lag(replica: Tuple[str, int]) -> Optional[float]:
     """
-    Creates the necessary tables for the PMS and inserts sample data.
-    Includes a trigger for automated feedback.
+    Returns the last measured lag, re-probing at most every REPLICA_LAG_CHECK_INTERVAL
+    seconds (REPLICA_RETRY_AFTER once unreachable). One caller probes; others use the last value.
     """
-    conn = get_db_connection()
-    if not conn:
+    with _routing_lock:
+        state = _replica_health.setdefault(replica, {'checked_at': None, 'lag': None, 'checking': False})
+        interval = REPLICA_LAG_CHECK_INTERVAL if state['lag'] is not None else REPLICA_RETRY_AFTER
+        fresh = state['checked_at'] is not None and time.monotonic() - state['checked_at'] < interval
+        if fresh or state['checking']:
+            return state['lag']
+        state['checking'] = True
+    lag = measure_replica_lag(replica)
+    with _routing_lock:
+        state.update(checked_at=time.monotonic(), lag=lag, checking=False)
+    return lag
+
+def _mark_replica_down(replica: Tuple[str, int]):
+    with _routing_lock:
+        _replica_health[replica] = {'checked_at': time.monotonic(), 'lag': None, 'checking': False}
+
+def set_session_key(key: Optional[str]):
+    """Identifies the current user session (per thread/context) for read-your-writes routing."""
+    _session_key.set(key)
+
+def _record_write():
+    key = _session_key.get()
+    if key is None or not DB_REPLICA_HOSTS:
         return
+    now = time.monotonic()
+    with _routing_lock:
+        _last_writes[key] = now
+        if len(_last_writes) > 1024:
+            for other, written_at in list(_last_writes.items()):
+                if now - written_at > READ_YOUR_WRITES_SECONDS:
+                    del _last_writes[other]
 
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            -- Users table to handle roles (Manager, Employee)
-            CREATE TABLE IF NOT EXISTS users (
-                user_id SERIAL PRIMARY KEY,
-                name VARCHAR(100) NOT NULL,
-                role VARCHAR(20) NOT NULL CHECK (role IN ('Manager', 'Employee'))
-            );
+def _wrote_recently() -> bool:
+    """True if the current session wrote within READ_YOUR_WRITES_SECONDS (replicas configured only)."""
+    key = _session_key.get()
+    if key is None or not DB_REPLICA_HOSTS:
+        return False
+    with _routing_lock:
+        written_at = _last_writes.get(key)
+    return written_at is not None and time.monotonic() - written_at < READ_YOUR_WRITES_SECONDS
 
-            -- Goals table to store goals set by managers
-            CREATE TABLE IF NOT EXISTS goals (
-                goal_id SERIAL PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                description TEXT,
-                due_date DATE,
-                status VARCHAR(20) NOT NULL CHECK (status IN ('Draft', 'In Progress', 'Completed', 'Cancelled')),
-                manager_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
-                employee_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE
-            );
+def _choose_replica() -> Optional[Tuple[str, int]]:
+    """Picks a sufficiently caught-up replica in round-robin order, or None for the primary."""
+    if not DB_REPLICA_HOSTS or _wrote_recently():
+        return None
+    start = next(_replica_turn)
+    for i in range(len(DB_REPLICA_HOSTS)):
+        replica = tuple(DB_REPLICA_HOSTS[(start + i) % len(DB_REPLICA_HOSTS)])
+        lag = _replica_lag(replica)
+        if lag is not None and lag <= REPLICA_MAX_LAG_SECONDS:
+            return replica
+    return None
 
-            -- Tasks table for employees to log tasks for goals
-            CREATE TABLE IF NOT EXISTS tasks (
-                task_id SERIAL PRIMARY KEY,
-                goal_id INTEGER REFERENCES goals(goal_id) ON DELETE CASCADE,
-                description TEXT NOT NULL,
-                is_approved BOOLEAN DEFAULT FALSE
-            );
+@contextmanager
+def db_connection(read_only: bool = False):
+    """
+    Checks a connection out of the pool for the duration of the block.
+    Uncommitted work is rolled back when the connection is returned.
 
-            -- Feedback table for managers to give feedback
-            CREATE TABLE IF NOT EXISTS feedback (
-                feedback_id SERIAL PRIMARY KEY,
-                goal_id INTEGER REFERENCES goals(goal_id) ON DELETE CASCADE,
-                manager_id INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
-                employee_id INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
-                feedback_text TEXT NOT NULL,
-                feedback_date TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
+    With `read_only` the block may run on a replica (see DB_REPLICA_HOSTS), falling
+    back to the primary if none is healthy. Otherwise it runs on the primary, and a
+    block that completes counts as a write of the current session.
+    """
+    started = time.perf_counter()
+    replica = _choose_replica() if read_only else None
+    with ExitStack() as stack:
+        if replica is not None:
+            try:
+                conn = stack.enter_context(_replica_pool(replica).connection())
+            except psycopg2.Error:
+                _mark_replica_down(replica)
+                replica = None
+        if replica is None:
+            conn = stack.enter_context(get_pool().connection())
+        instrumentation.record_connect(time.perf_counter() - started)
+        instrumentation.registry.increment(
+            "epms_db_routes_total", "Connection checkouts by access kind and server.",
+            kind='read' if read_only else 'write', server=f"{replica[0]}:{replica[1]}" if replica else 'primary'
+        )
+        yield conn
+    if not read_only:
+        _record_write()
+
+def close_pool():
+    """Closes the process-wide pools; the next query opens new ones (e.g. after changing DB_* settings)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+        for pool in _replica_pools.values():
+            pool.closeall()
+        _replica_pools.clear()
+    with _routing_lock:
+        _replica_health.clear()
 
-        # Trigger Function for automated feedback
+def get_replica_status() -> List[Dict[str, Any]]:
+    """Returns the configured replicas with their last measured lag and whether reads may use them."""
+    status = []
+    for replica in DB_REPLICA_HOSTS:
+        lag = _replica_lag(tuple(replica))
+        status.append({
+            'host': replica[0],
+            'port': replica[1],
+            'lag_seconds': lag,
+            'serving_reads': lag is not None and lag <= REPLICA_MAX_LAG_SECONDS,
+        })
+    return status
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Returns connection pool usage and wait-queue metrics."""
+    return get_pool().stats()
+
+def metrics_text() -> str:
+    """Renders query timings, pool and cache stats in Prometheus text format."""
+    gauges = {}
+    if _pool is not None:
+        for key, value in get_pool_stats().items():
+            if isinstance(value, (int, float)):
+                gauges[f"epms_pool_{key}"] = (f"Connection pool {key.replace('_', ' ')}.", value)
+    for key, value in result_cache.stats().items():
+        if isinstance(value, (int, float)):
+            gauges[f"epms_cache_{key}"] = (f"Result cache {key.replace('_', ' ')}.", value)
+    return instrumentation.registry.render(gauges)
+
+def start_metrics_server():
+    """Serves `metrics_text` on METRICS_PORT (if set) from a background thread."""
+    global _metrics_server
+    with _pool_lock:
+        if METRICS_PORT is not None and _metrics_server is None:
+            _metrics_server = instrumentation.start_metrics_server(METRICS_PORT, metrics_text)
+
+def start_query_trace() -> List[Dict[str, Any]]:
+    """Collects timings of the queries run by this thread from now on (e.g. one Streamlit rerun)."""
+    return instrumentation.start_trace()
+
+def start_cache_listener():
+    """Starts the background LISTEN thread that applies other processes' invalidations."""
+    global _cache_listener
+    with _pool_lock:
+        if CACHE_ENABLED and _cache_listener is None:
+            _cache_listener = InvalidationListener(_connect, result_cache, CACHE_CHANNEL)
+            _cache_listener.start()
+
+def _is_cacheable(result) -> bool:
+    """
+    Error results (an empty dict or a DataFrame without columns) are not cached.
+    Paged results are (DataFrame, cursor) tuples and are judged by their DataFrame.
+    """
+    if isinstance(result, tuple) and result and isinstance(result[0], pd.DataFrame):
+        result = result[0]
+    if isinstance(result, pd.DataFrame):
+        return len(result.columns) > 0
+    return bool(result)
+
+def _cached(tags):
+    # A session that just wrote skips the cache, which other sessions may have
+    # filled from a replica that had not yet replayed the write.
+    return result_cache.cached(tags, cacheable=_is_cacheable, enabled=lambda: CACHE_ENABLED and not _wrote_recently())
+
+def goal_cache_tags(manager_id: int, employee_id: int) -> List[str]:
+    """Cache tags for data derived from a goal with this manager and employee."""
+    return [f"goals:Manager:{manager_id}", f"goals:Employee:{employee_id}", f"history:{employee_id}"]
+
+def invalidate_cache(cur, tags: List[str]):
+    """
+    Publishes cache invalidations on the current transaction and drops local entries.
+    Call just before commit; other processes apply the tags once it commits.
+    """
+    if not CACHE_ENABLED:
+        return
+    publish_invalidation(cur, CACHE_CHANNEL, tags)
+    result_cache.invalidate(tags)
+
+def insert_sample_data(conn):
+    """Inserts the demo users and goals if the users table is empty."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT EXISTS (SELECT 1 FROM users);")
+        if cur.fetchone()[0]:
+            print("Database data already exists. Skipping sample data.")
+            return
+
+        sample_users = [
+            ('Jane Doe', 'Manager', None),
+            ('John Smith', 'Employee', 1),
+            ('Alice Johnson', 'Employee', 1)
+        ]
+        cur.executemany("INSERT INTO users (name, role, manager_id) VALUES (%s, %s, %s);", sample_users)
+
+        sample_goals = [
+            ('Q3 Sales Target', 'Achieve 15% growth in Q3 sales.', '2025-09-30', 'In Progress', 1, 2),
+            ('Complete Certification', 'Finish Python certification course.', '2025-08-31', 'Completed', 1, 3),
+            ('Project A', 'Lead the new project from start to finish.', '2025-12-15', 'Draft', 1, 2)
+        ]
+        cur.executemany("INSERT INTO goals (title, description, due_date, status, manager_id, employee_id) VALUES (%s, %s, %s, %s, %s, %s);", sample_goals)
+    conn.commit()
+    print("Sample data inserted.")
+
+def ensure_feedback_partitions(conn, quarters_ahead: int = FEEDBACK_PARTITIONS_AHEAD) -> int:
+    """Creates any missing feedback partitions from the current quarter on. Returns how many were created."""
+    with conn.cursor() as cur:
         cur.execute("""
-            CREATE OR REPLACE FUNCTION log_automated_feedback()
-            RETURNS TRIGGER AS $$
-            DECLARE
-                goal_title TEXT;
-            BEGIN
-                IF NEW.status = 'Completed' AND OLD.status != 'Completed' THEN
-                    SELECT title INTO goal_title FROM goals WHERE goal_id = NEW.goal_id;
-                    INSERT INTO feedback (goal_id, manager_id, employee_id, feedback_text)
-                    VALUES (
-                        NEW.goal_id,
-                        NEW.manager_id,
-                        NEW.employee_id,
-                        'Automated feedback: Goal "' || goal_title || '" has been marked as Completed. Great job!'
-                    );
-                END IF;
-                RETURN NEW;
-            END;
-            $$ LANGUAGE plpgsql;
-
-            -- Trigger that fires when a goal's status is updated
-            DO $$
-            BEGIN
-                IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'goal_status_change') THEN
-                    CREATE TRIGGER goal_status_change
-                    AFTER UPDATE OF status ON goals
-                    FOR EACH ROW
-                    EXECUTE FUNCTION log_automated_feedback();
-                END IF;
-            END
-            $$;
-        """)
-
-        # Insert sample data if tables are empty
-        cur.execute("SELECT COUNT(*) FROM users;")
-        if cur.fetchone()[0] == 0:
-            sample_users = [
-                ('Jane Doe', 'Manager'),
-                ('John Smith', 'Employee'),
-                ('Alice Johnson', 'Employee')
-            ]
-            cur.executemany("INSERT INTO users (name, role) VALUES (%s, %s);", sample_users)
-            
-            sample_goals = [
-                ('Q3 Sales Target', 'Achieve 15% growth in Q3 sales.', '2025-09-30', 'In Progress', 1, 2),
-                ('Complete Certification', 'Finish Python certification course.', '2025-08-31', 'Completed', 1, 3),
-                ('Project A', 'Lead the new project from start to finish.', '2025-12-15', 'Draft', 1, 2)
-            ]
-            cur.executemany("INSERT INTO goals (title, description, due_date, status, manager_id, employee_id) VALUES (%s, %s, %s, %s, %s, %s);", sample_goals)
-            
-            conn.commit()
-            print("Database tables and trigger created, and sample data inserted.")
-        else:
-            print("Database tables and data already exist. Skipping initialization.")
+            SELECT ensure_feedback_partitions(
+                (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date,
+                ((CURRENT_TIMESTAMP AT TIME ZONE 'UTC') + %s * INTERVAL '3 months')::date
+            );
+        """, (quarters_ahead,))
+        created = cur.fetchone()[0]
+    conn.commit()
+    return created
 
+@instrumented
+def init_database() -> bool:
+    """
+    Applies pending schema migrations, creates upcoming feedback partitions and
+    inserts sample data into an empty database. Returns False if any step failed,
+    so callers that run this once per process can retry instead of caching it.
+    Call once per process at startup (or run `python migrate.py`), never per request.
+    """
+    try:
+        with db_connection() as conn:
+            migrate.apply_migrations(conn)
+            ensure_feedback_partitions(conn)
+            insert_sample_data(conn)
+        start_cache_listener()
+        start_metrics_server()
+        return True
     except (Exception, psycopg2.Error) as error:
-        st.error(f"Error creating tables or inserting data: {error}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        st.error(f"Error initializing database: {error}")
+        return False
 
+@instrumented
+@_cached(lambda: ["users"])
 def get_users() -> pd.DataFrame:
     """Fetches all users for login and selection."""
-    conn = get_db_connection()
-    if not conn:
-        return pd.DataFrame()
     query = "SELECT user_id, name, role FROM users ORDER BY name;"
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+    try:
+        with db_connection(read_only=True) as conn:
+            return pd.read_sql(query, conn)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching users: {error}")
+        return pd.DataFrame()
 
+@instrumented
 def get_dashboard_metrics(user_id: int, role: str) -> Dict[str, Any]:
-    """Calculates key metrics for the dashboard based on user role."""
-    conn = get_db_connection()
-    if not conn:
-        return {}
-    
+    """
+    Calculates key metrics for the dashboard based on user role in a single query:
+    counts per status, overdue goals and open goals due this week.
+    """
+    column = ROLE_COLUMNS.get(role, 'employee_id')
+    scope = 'Manager' if role == 'Manager' else 'Employee'
+    open_filters = """
+        COUNT(*) FILTER (WHERE due_date < CURRENT_DATE) AS overdue_goals,
+        COUNT(*) FILTER (
+            WHERE due_date BETWEEN CURRENT_DATE AND date_trunc('week', CURRENT_DATE)::date + 6
+        ) AS due_this_week
+    """
+    if USE_GOAL_SUMMARY:
+        # Status counts come from the trigger-maintained summary table; only
+        # the user's open goals are scanned for the date-dependent counts.
+        query = f"""
+            SELECT
+                (SELECT COALESCE(json_object_agg(status, goal_count), '{{}}')
+                 FROM goal_status_counts WHERE user_id = %(user_id)s AND scope = %(scope)s) AS status_counts,
+                {open_filters}
+            FROM goals
+            WHERE {column} = %(user_id)s AND status IN ('Draft', 'In Progress');
+        """
+    else:
+        query = f"""
+            SELECT
+                json_build_object(
+                    'Draft', COUNT(*) FILTER (WHERE status = 'Draft'),
+                    'In Progress', COUNT(*) FILTER (WHERE status = 'In Progress'),
+                    'Completed', COUNT(*) FILTER (WHERE status = 'Completed'),
+                    'Cancelled', COUNT(*) FILTER (WHERE status = 'Cancelled')
+                ) AS status_counts,
+                COUNT(*) FILTER (WHERE due_date < CURRENT_DATE AND status IN ('Draft', 'In Progress')) AS overdue_goals,
+                COUNT(*) FILTER (
+                    WHERE due_date BETWEEN CURRENT_DATE AND date_trunc('week', CURRENT_DATE)::date + 6
+                      AND status IN ('Draft', 'In Progress')
+                ) AS due_this_week
+            FROM goals
+            WHERE {column} = %(user_id)s;
+        """
     try:
-        cur = conn.cursor()
-        if role == 'Manager':
-            cur.execute("SELECT COUNT(*) FROM goals WHERE manager_id = %s;", (user_id,))
-            total_goals = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM goals WHERE manager_id = %s AND status = 'Completed';", (user_id,))
-            completed_goals = cur.fetchone()[0]
-        else:
-            cur.execute("SELECT COUNT(*) FROM goals WHERE employee_id = %s;", (user_id,))
-            total_goals = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM goals WHERE employee_id = %s AND status = 'Completed';", (user_id,))
-            completed_goals = cur.fetchone()[0]
-        
+        with db_connection(read_only=True) as conn, conn.cursor() as cur:
+            cur.execute(query, {'user_id': user_id, 'scope': scope})
+            counts, overdue_goals, due_this_week = cur.fetchone()
+
+        status_counts = {status: int(counts.get(status, 0)) for status in GOAL_STATUSES}
         metrics = {
-            'total_goals': total_goals,
-            'completed_goals': completed_goals
+            'total_goals': sum(status_counts.values()),
+            'completed_goals': status_counts['Completed'],
+            'status_counts': status_counts,
+            'overdue_goals': overdue_goals,
+            'due_this_week': due_this_week
         }
         return metrics
     except (Exception, psycopg2.Error) as error:
         st.error(f"Error fetching dashboard metrics: {error}")
         return {}
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
+@instrumented
+@_cached(lambda user_id, role: [f"goals:{'Manager' if role == 'Manager' else 'Employee'}:{user_id}"])
 def get_goals(user_id: int, role: str) -> pd.DataFrame:
     """Fetches goals based on the user's role."""
-    conn = get_db_connection()
-    if not conn:
-        return pd.DataFrame()
-    
     if role == 'Manager':
         query = """
             SELECT
-                g.goal_id, g.title, g.description, g.due_date, g.status, u_emp.name AS employee_name
+                g.goal_id, g.title, g.description, g.due_date, g.status, u_emp.name AS employee_name,
+                g.task_count, g.approved_count, (100.0 * g.approved_count / NULLIF(g.task_count, 0))::float8 AS progress_pct,
+                g.manager_id, g.employee_id
             FROM goals g
             JOIN users u_emp ON g.employee_id = u_emp.user_id
             WHERE g.manager_id = %s;
         """
-        df = pd.read_sql(query, conn, params=(user_id,))
     else:
         query = """
             SELECT
-                g.goal_id, g.title, g.description, g.due_date, g.status, u_mgr.name AS manager_name
+                g.goal_id, g.title, g.description, g.due_date, g.status, u_mgr.name AS manager_name,
+                g.task_count, g.approved_count, (100.0 * g.approved_count / NULLIF(g.task_count, 0))::float8 AS progress_pct,
+                g.manager_id, g.employee_id
             FROM goals g
             JOIN users u_mgr ON g.manager_id = u_mgr.user_id
             WHERE g.employee_id = %s;
         """
-        df = pd.read_sql(query, conn, params=(user_id,))
-    
-    conn.close()
-    return df
+    try:
+        with db_connection(read_only=True) as conn:
+            return pd.read_sql(query, conn, params=(user_id,))
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching goals: {error}")
+        return pd.DataFrame()
 
+@instrumented
 def add_goal(title: str, description: str, due_date: str, manager_id: int, employee_id: int):
     """Adds a new goal to the database."""
-    conn = get_db_connection()
-    if not conn:
-        return
-    cur = conn.cursor()
     try:
-        cur.execute(
-            "INSERT INTO goals (title, description, due_date, status, manager_id, employee_id) VALUES (%s, %s, %s, %s, %s, %s);",
-            (title, description, due_date, 'Draft', manager_id, employee_id)
-        )
-        conn.commit()
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO goals (title, description, due_date, status, manager_id, employee_id) VALUES (%s, %s, %s, %s, %s, %s);",
+                (title, description, due_date, 'Draft', manager_id, employee_id)
+            )
+            invalidate_cache(cur, goal_cache_tags(manager_id, employee_id))
+            conn.commit()
     except (Exception, psycopg2.Error) as error:
         st.error(f"Error adding goal: {error}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
+@instrumented
 def update_goal_status(goal_id: int, status: str):
     """Updates the status of a goal (manager-only action)."""
-    conn = get_db_connection()
-    if not conn:
-        return
-    cur = conn.cursor()
     try:
-        cur.execute(
-            "UPDATE goals SET status = %s WHERE goal_id = %s;",
-            (status, goal_id)
-        )
-        conn.commit()
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE goals SET status = %s WHERE goal_id = %s RETURNING manager_id, employee_id;",
+                (status, goal_id)
+            )
+            row = cur.fetchone()
+            if row:
+                invalidate_cache(cur, goal_cache_tags(*row))
+            conn.commit()
     except (Exception, psycopg2.Error) as error:
         st.error(f"Error updating goal status: {error}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
+@instrumented
+def update_goal_statuses(goal_ids: List[int], status: str) -> int:
+    """
+    Updates the status of many goals in one statement and one transaction,
+    e.g. when closing a quarter. Returns the number of goals updated.
+    """
+    if not goal_ids:
+        return 0
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE goals SET status = %s WHERE goal_id = ANY(%s) RETURNING manager_id, employee_id;",
+                (status, [int(goal_id) for goal_id in goal_ids])
+            )
+            rows = cur.fetchall()
+            tags = set()
+            for manager_id, employee_id in rows:
+                tags.update(goal_cache_tags(manager_id, employee_id))
+            invalidate_cache(cur, sorted(tags))
+            conn.commit()
+        return len(rows)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error updating goal statuses: {error}")
+        return 0
+
+@instrumented
 def add_task(goal_id: int, description: str):
     """Adds a new task to a goal."""
-    conn = get_db_connection()
-    if not conn:
-        return
-    cur = conn.cursor()
     try:
-        cur.execute(
-            "INSERT INTO tasks (goal_id, description) VALUES (%s, %s);",
-            (goal_id, description)
-        )
-        conn.commit()
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO tasks (goal_id, description) VALUES (%s, %s);",
+                (goal_id, description)
+            )
+            # The insert trigger bumps goals.task_count, which goal listings show
+            cur.execute("SELECT manager_id, employee_id FROM goals WHERE goal_id = %s;", (goal_id,))
+            row = cur.fetchone()
+            invalidate_cache(cur, [f"tasks:{goal_id}"] + (goal_cache_tags(*row) if row else []))
+            conn.commit()
     except (Exception, psycopg2.Error) as error:
         st.error(f"Error adding task: {error}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
+@instrumented
+def approve_task(task_id: int) -> bool:
+    """Approves a single task (manager-only action). Returns True if it was pending."""
+    return approve_tasks([task_id]) == 1
+
+@instrumented
+def approve_tasks(task_ids: List[int]) -> int:
+    """
+    Approves many tasks in one statement and one transaction; the update trigger
+    on tasks adjusts each affected goal's approved_count once. Tasks that are
+    already approved are skipped. Returns the number of tasks approved.
+    """
+    if not task_ids:
+        return 0
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE tasks t
+                SET is_approved = TRUE
+                FROM goals g
+                WHERE g.goal_id = t.goal_id
+                  AND t.task_id = ANY(%s)
+                  AND t.is_approved IS NOT TRUE
+                RETURNING t.goal_id, g.manager_id, g.employee_id;
+                """,
+                ([int(task_id) for task_id in task_ids],)
+            )
+            rows = cur.fetchall()
+            tags = set()
+            for goal_id, manager_id, employee_id in rows:
+                tags.add(f"tasks:{goal_id}")
+                tags.update(goal_cache_tags(manager_id, employee_id))
+            invalidate_cache(cur, sorted(tags))
+            conn.commit()
+        return len(rows)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error approving tasks: {error}")
+        return 0
+
+@instrumented
+@_cached(lambda goal_id: [f"tasks:{goal_id}"])
 def get_tasks_for_goal(goal_id: int) -> pd.DataFrame:
     """Fetches tasks for a specific goal."""
-    conn = get_db_connection()
-    if not conn:
-        return pd.DataFrame()
     query = "SELECT task_id, description, is_approved FROM tasks WHERE goal_id = %s ORDER BY task_id;"
-    df = pd.read_sql(query, conn, params=(goal_id,))
-    conn.close()
-    return df
+    try:
+        with db_connection(read_only=True) as conn:
+            return pd.read_sql(query, conn, params=(goal_id,))
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching tasks: {error}")
+        return pd.DataFrame()
 
+@instrumented
 def add_feedback(goal_id: int, manager_id: int, employee_id: int, feedback_text: str):
     """Adds written feedback for a goal."""
-    conn = get_db_connection()
-    if not conn:
-        return
-    cur = conn.cursor()
     try:
-        cur.execute(
-            "INSERT INTO feedback (goal_id, manager_id, employee_id, feedback_text) VALUES (%s, %s, %s, %s);",
-            (goal_id, manager_id, employee_id, feedback_text)
-        )
-        conn.commit()
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO feedback (goal_id, manager_id, employee_id, feedback_text) VALUES (%s, %s, %s, %s);",
+                (goal_id, manager_id, employee_id, feedback_text)
+            )
+            invalidate_cache(cur, [f"history:{employee_id}"])
+            conn.commit()
     except (Exception, psycopg2.Error) as error:
         st.error(f"Error adding feedback: {error}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
+@instrumented
+@_cached(lambda employee_id: [f"history:{employee_id}"])
 def get_performance_history(employee_id: int) -> Dict[str, Any]:
     """
     Retrieves an employee's performance history including goals and feedback.
     """
-    conn = get_db_connection()
-    if not conn:
-        return {}
-    
+    goals_query = """
+        SELECT
+            g.goal_id, g.title, g.description, g.due_date, g.status, u.name AS manager_name
+        FROM goals g
+        JOIN users u ON g.manager_id = u.user_id
+        WHERE g.employee_id = %s
+        ORDER BY g.due_date DESC;
+    """
+    feedback_query = """
+        SELECT
+            f.feedback_date, f.feedback_text, u.name AS manager_name, g.title AS goal_title
+        FROM feedback f
+        JOIN users u ON f.manager_id = u.user_id
+        JOIN goals g ON f.goal_id = g.goal_id
+        WHERE f.employee_id = %s
+        ORDER BY f.feedback_date DESC;
+    """
     try:
-        goals_query = """
-            SELECT
-                g.goal_id, g.title, g.description, g.due_date, g.status, u.name AS manager_name
-            FROM goals g
-            JOIN users u ON g.manager_id = u.user_id
-            WHERE g.employee_id = %s
-            ORDER BY g.due_date DESC;
-        """
-        goals_df = pd.read_sql(goals_query, conn, params=(employee_id,))
-        
-        feedback_query = """
-            SELECT
-                f.feedback_date, f.feedback_text, u.name AS manager_name, g.title AS goal_title
-            FROM feedback f
-            JOIN users u ON f.manager_id = u.user_id
-            JOIN goals g ON f.goal_id = g.goal_id
-            WHERE f.employee_id = %s
-            ORDER BY f.feedback_date DESC;
-        """
-        feedback_df = pd.read_sql(feedback_query, conn, params=(employee_id,))
-        
+        # Both queries share one pooled connection.
+        with db_connection(read_only=True) as conn:
+            goals_df = pd.read_sql(goals_query, conn, params=(employee_id,))
+            feedback_df = pd.read_sql(feedback_query, conn, params=(employee_id,))
+
         history = {
             'goals': goals_df,
             'feedback': feedback_df
@@ -329,16 +675,551 @@ def get_performance_history(employee_id: int) -> Dict[str, Any]:
     except (Exception, psycopg2.Error) as error:
         st.error(f"Error fetching performance history: {error}")
         return {}
-    finally:
-        if conn:
-            conn.close()
 
+def _keyset_value(value):
+    """Converts a pandas cell into a plain Python value usable as a keyset cursor."""
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+def _goals_listing_query(role: str, descending: bool, keyset: bool) -> str:
+    """
+    Builds the goals listing ordered by (due_date, goal_id). NULL due dates sort as
+    'infinity' so the expression index serves both directions: they come last when
+    ascending and first when `descending` (e.g. the history view).
+    """
+    if role == 'Manager':
+        select = "g.goal_id, g.title, g.description, g.due_date, g.status, u.name AS employee_name"
+        join = "JOIN users u ON g.employee_id = u.user_id"
+    else:
+        select = "g.goal_id, g.title, g.description, g.due_date, g.status, u.name AS manager_name"
+        join = "JOIN users u ON g.manager_id = u.user_id"
+    select += ", g.task_count, g.approved_count, (100.0 * g.approved_count / NULLIF(g.task_count, 0))::float8 AS progress_pct"
+    column = ROLE_COLUMNS.get(role, 'employee_id')
+    direction, operator = ("DESC", "<") if descending else ("ASC", ">")
+    after = ""
+    if keyset:
+        after = f"""
+              AND (COALESCE(g.due_date, 'infinity'::date), g.goal_id)
+                  {operator} (COALESCE(%(after_due)s::date, 'infinity'::date), %(after_id)s)"""
+    return f"""
+            SELECT {select}
+            FROM goals g
+            {join}
+            WHERE g.{column} = %(user_id)s{after}
+            ORDER BY COALESCE(g.due_date, 'infinity'::date) {direction}, g.goal_id {direction}
+    """
+
+@instrumented
+@_cached(lambda user_id, role, after=None, page_size=PAGE_SIZE, descending=False:
+         [f"goals:{'Manager' if role == 'Manager' else 'Employee'}:{user_id}"])
+def get_goals_page(user_id: int, role: str, after: Optional[Tuple] = None,
+                   page_size: int = PAGE_SIZE, descending: bool = False) -> Tuple[pd.DataFrame, Optional[Tuple]]:
+    """
+    Fetches one page of goals ordered by (due_date, goal_id) using keyset pagination.
+    Pass the returned cursor as `after` to get the next page; it is None on the last page.
+    """
+    query = _goals_listing_query(role, descending, keyset=after is not None) + " LIMIT %(limit)s;"
+    params = {'user_id': user_id, 'limit': page_size + 1}
+    if after is not None:
+        params['after_due'], params['after_id'] = after
+    try:
+        with db_connection(read_only=True) as conn:
+            df = pd.read_sql(query, conn, params=params)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching goals: {error}")
+        return pd.DataFrame(), None
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (_keyset_value(last['due_date']), int(last['goal_id']))
+    return df, next_cursor
+
+def _feedback_listing_query(keyset: bool) -> str:
+    """
+    Builds an employee's feedback listing, newest first by (feedback_date, feedback_id).
+    feedback_date is the NOT NULL partition key, so newer quarters are scanned first.
+    """
+    after = ""
+    if keyset:
+        after = """
+              AND (f.feedback_date, f.feedback_id) < (%(after_date)s::timestamptz, %(after_id)s)"""
+    return f"""
+            SELECT
+                f.feedback_id, f.feedback_date, f.feedback_text, u.name AS manager_name, g.title AS goal_title
+            FROM feedback f
+            JOIN users u ON f.manager_id = u.user_id
+            JOIN goals g ON f.goal_id = g.goal_id
+            WHERE f.employee_id = %(employee_id)s{after}
+            ORDER BY f.feedback_date DESC, f.feedback_id DESC
+    """
+
+@instrumented
+@_cached(lambda employee_id, after=None, page_size=PAGE_SIZE: [f"history:{employee_id}"])
+def get_feedback_page(employee_id: int, after: Optional[Tuple] = None,
+                      page_size: int = PAGE_SIZE) -> Tuple[pd.DataFrame, Optional[Tuple]]:
+    """
+    Fetches one page of an employee's feedback, newest first, using keyset pagination
+    on (feedback_date, feedback_id). Returns the page and the cursor for the next one.
+    """
+    query = _feedback_listing_query(keyset=after is not None) + " LIMIT %(limit)s;"
+    params = {'employee_id': employee_id, 'limit': page_size + 1}
+    if after is not None:
+        params['after_date'], params['after_id'] = after
+    try:
+        with db_connection(read_only=True) as conn:
+            df = pd.read_sql(query, conn, params=params)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching feedback history: {error}")
+        return pd.DataFrame(), None
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (_keyset_value(last['feedback_date']), int(last['feedback_id']))
+    return df, next_cursor
+
+def _stream_query(query: str, params: Dict[str, Any], chunk_size: int, label: str) -> Iterator[pd.DataFrame]:
+    """
+    Runs `query` through a named server-side cursor and yields DataFrames of up to
+    `chunk_size` rows, so only one chunk is held in memory at a time.
+    The pooled connection is held until the generator is exhausted or closed.
+    Queries are timed under `label`, since the generator runs outside the caller.
+    """
+    with db_connection(read_only=True) as conn:
+        with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cur:
+            cur.label = label
+            cur.itersize = chunk_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=[column[0] for column in cur.description])
+
+def iter_goals(user_id: int, role: str, chunk_size: int = 1000, descending: bool = False) -> Iterator[pd.DataFrame]:
+    """Streams all of a user's goals in (due_date, goal_id) order as DataFrame chunks."""
+    query = _goals_listing_query(role, descending, keyset=False) + ";"
+    return _stream_query(query, {'user_id': user_id}, chunk_size, 'iter_goals')
+
+def iter_feedback(employee_id: int, chunk_size: int = 1000) -> Iterator[pd.DataFrame]:
+    """Streams all of an employee's feedback, newest first, as DataFrame chunks."""
+    query = _feedback_listing_query(keyset=False) + ";"
+    return _stream_query(query, {'employee_id': employee_id}, chunk_size, 'iter_feedback')
+
+@instrumented
+@_cached(lambda: ["users"])
 def get_employees() -> pd.DataFrame:
     """Fetches all employees for manager assignment."""
-    conn = get_db_connection()
-    if not conn:
-        return pd.DataFrame()
     query = "SELECT user_id, name FROM users WHERE role = 'Employee' ORDER BY name;"
-    df = pd.read_sql(query, conn)
-    conn.close()
+    try:
+        with db_connection(read_only=True) as conn:
+            return pd.read_sql(query, conn)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching employees: {error}")
+        return pd.DataFrame()
+
+@instrumented
+@_cached(lambda user_id, role: [f"rollups:{'Manager' if role == 'Manager' else 'Employee'}:{user_id}"])
+def get_goal_rollups(user_id: int, role: str) -> pd.DataFrame:
+    """
+    Fetches the precomputed quarterly rollups (refreshed by analytics.py) for a
+    manager's team or an employee, oldest quarter first.
+    """
+    scope = 'Manager' if role == 'Manager' else 'Employee'
+    query = """
+        SELECT
+            quarter, total_goals, completed_goals, cancelled_goals,
+            completion_rate, on_time_rate, cancellation_rate, refreshed_at
+        FROM goal_rollups
+        WHERE scope = %s AND user_id = %s
+        ORDER BY quarter;
+    """
+    try:
+        with db_connection(read_only=True) as conn:
+            return pd.read_sql(query, conn, params=(scope, user_id))
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching goal analytics: {error}")
+        return pd.DataFrame()
+
+def _json_frame(records: List[Dict[str, Any]], columns: List[str], date_columns=(), timestamp_columns=()) -> pd.DataFrame:
+    """Builds a DataFrame from json_agg output, restoring date and timestamp types."""
+    df = pd.DataFrame.from_records(records or [], columns=columns)
+    for column in date_columns:
+        df[column] = pd.to_datetime(df[column]).dt.date
+    for column in timestamp_columns:
+        df[column] = pd.to_datetime(df[column], utc=True)
     return df
+
+@instrumented
+def get_page_bundle(user_id: int, role: str, goal_id: Optional[int] = None,
+                    employee_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Fetches everything a role's page needs in one round trip: metrics, goals,
+    tasks for the selected goal, the employee list (managers) and the first page
+    of performance history, assembled server-side with CTEs and json_agg.
+
+    `goal_id` defaults to the user's first goal and, for managers, `employee_id`
+    defaults to the first employee by name. Returns the same DataFrames and
+    metrics dict as the individual backend functions.
+    """
+    is_manager = role == 'Manager'
+    column = ROLE_COLUMNS.get(role, 'employee_id')
+    other_column, name_column = ('employee_id', 'employee_name') if is_manager else ('manager_id', 'manager_name')
+    if USE_GOAL_SUMMARY:
+        # Same source as get_dashboard_metrics: the trigger-maintained summary table
+        status_counts = """
+                SELECT COALESCE(json_object_agg(status, goal_count), '{}')
+                FROM goal_status_counts WHERE user_id = %(user_id)s AND scope = %(scope)s
+        """
+    else:
+        status_counts = """
+                SELECT json_build_object(
+                    'Draft', COUNT(*) FILTER (WHERE status = 'Draft'),
+                    'In Progress', COUNT(*) FILTER (WHERE status = 'In Progress'),
+                    'Completed', COUNT(*) FILTER (WHERE status = 'Completed'),
+                    'Cancelled', COUNT(*) FILTER (WHERE status = 'Cancelled')
+                ) FROM my_goals
+        """
+    query = f"""
+        WITH my_goals AS (
+            SELECT
+                g.goal_id, g.title, g.description, g.due_date, g.status, u.name AS {name_column},
+                g.task_count, g.approved_count, (100.0 * g.approved_count / NULLIF(g.task_count, 0))::float8 AS progress_pct,
+                g.manager_id, g.employee_id
+            FROM goals g
+            JOIN users u ON g.{other_column} = u.user_id
+            WHERE g.{column} = %(user_id)s
+        ),
+        selected_goal AS (
+            SELECT COALESCE(%(goal_id)s::integer, (SELECT MIN(goal_id) FROM my_goals)) AS goal_id
+        ),
+        employees AS (
+            SELECT user_id, name FROM users WHERE role = 'Employee' AND %(is_manager)s
+        ),
+        history_employee AS (
+            SELECT CASE WHEN %(is_manager)s
+                THEN COALESCE(%(employee_id)s::integer, (SELECT user_id FROM employees ORDER BY name LIMIT 1))
+                ELSE %(user_id)s
+            END AS employee_id
+        ),
+        history_goals AS (
+            SELECT
+                g.goal_id, g.title, g.description, g.due_date, g.status, u.name AS manager_name,
+                g.task_count, g.approved_count, (100.0 * g.approved_count / NULLIF(g.task_count, 0))::float8 AS progress_pct
+            FROM goals g
+            JOIN users u ON g.manager_id = u.user_id
+            WHERE g.employee_id = (SELECT employee_id FROM history_employee)
+            ORDER BY COALESCE(g.due_date, 'infinity'::date) DESC, g.goal_id DESC
+            LIMIT %(page_size)s
+        ),
+        history_feedback AS (
+            SELECT
+                f.feedback_id, f.feedback_date, f.feedback_text, u.name AS manager_name, g.title AS goal_title
+            FROM feedback f
+            JOIN users u ON f.manager_id = u.user_id
+            JOIN goals g ON f.goal_id = g.goal_id
+            WHERE f.employee_id = (SELECT employee_id FROM history_employee)
+            ORDER BY f.feedback_date DESC, f.feedback_id DESC
+            LIMIT %(page_size)s
+        )
+        SELECT json_build_object(
+            'status_counts', ({status_counts}),
+            'overdue_goals', (
+                SELECT COUNT(*) FROM my_goals
+                WHERE status IN ('Draft', 'In Progress') AND due_date < CURRENT_DATE
+            ),
+            'due_this_week', (
+                SELECT COUNT(*) FROM my_goals
+                WHERE status IN ('Draft', 'In Progress')
+                  AND due_date BETWEEN CURRENT_DATE AND date_trunc('week', CURRENT_DATE)::date + 6
+            ),
+            'goals', (SELECT json_agg(g ORDER BY g.goal_id) FROM my_goals g),
+            'selected_goal_id', (SELECT goal_id FROM selected_goal),
+            'tasks', (
+                SELECT json_agg(t ORDER BY t.task_id)
+                FROM (
+                    SELECT task_id, description, is_approved FROM tasks
+                    WHERE goal_id = (SELECT goal_id FROM selected_goal)
+                ) t
+            ),
+            'employees', (SELECT json_agg(e ORDER BY e.name) FROM employees e),
+            'history_employee_id', (SELECT employee_id FROM history_employee),
+            'history_goals', (
+                SELECT json_agg(h ORDER BY COALESCE(h.due_date, 'infinity'::date) DESC, h.goal_id DESC)
+                FROM history_goals h
+            ),
+            'history_feedback', (
+                SELECT json_agg(h ORDER BY h.feedback_date DESC, h.feedback_id DESC)
+                FROM history_feedback h
+            )
+        );
+    """
+    params = {
+        'user_id': user_id,
+        'goal_id': goal_id,
+        'employee_id': employee_id,
+        'is_manager': is_manager,
+        'scope': 'Manager' if is_manager else 'Employee',
+        'page_size': PAGE_SIZE
+    }
+    try:
+        with db_connection(read_only=True) as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            bundle = cur.fetchone()[0]
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching page data: {error}")
+        return {}
+
+    status_counts = {status: int(bundle['status_counts'].get(status, 0)) for status in GOAL_STATUSES}
+    return {
+        'metrics': {
+            'total_goals': sum(status_counts.values()),
+            'completed_goals': status_counts['Completed'],
+            'status_counts': status_counts,
+            'overdue_goals': bundle['overdue_goals'],
+            'due_this_week': bundle['due_this_week']
+        },
+        'goals': _json_frame(
+            bundle['goals'],
+            ['goal_id', 'title', 'description', 'due_date', 'status', name_column,
+             'task_count', 'approved_count', 'progress_pct', 'manager_id', 'employee_id'],
+            date_columns=['due_date']
+        ),
+        'selected_goal_id': bundle['selected_goal_id'],
+        'tasks': _json_frame(bundle['tasks'], ['task_id', 'description', 'is_approved']),
+        'employees': _json_frame(bundle['employees'], ['user_id', 'name']),
+        'history_employee_id': bundle['history_employee_id'],
+        'history': {
+            'goals': _json_frame(
+                bundle['history_goals'],
+                ['goal_id', 'title', 'description', 'due_date', 'status', 'manager_name',
+                 'task_count', 'approved_count', 'progress_pct'],
+                date_columns=['due_date']
+            ),
+            'feedback': _json_frame(
+                bundle['history_feedback'],
+                ['feedback_id', 'feedback_date', 'feedback_text', 'manager_name', 'goal_title'],
+                timestamp_columns=['feedback_date']
+            )
+        }
+    }
+
+@instrumented
+def search(user_id: int, role: str, query: str, limit: int = 20) -> pd.DataFrame:
+    """
+    Ranked full-text search over the goals, tasks and feedback visible to a
+    user: a manager's team goals or an employee's own. `query` uses web search
+    syntax ("q3 sales", "certification -aws", "\"customer satisfaction\"").
+
+    Each kind is matched through its GIN index and cut to `limit` before
+    merging, and highlighted snippets are built only for the final rows.
+    Returns the columns in SEARCH_COLUMNS, best match first.
+    """
+    if not query or not query.strip():
+        return pd.DataFrame(columns=SEARCH_COLUMNS)
+    column = ROLE_COLUMNS.get(role, 'employee_id')
+    sql = f"""
+        WITH q AS (
+            SELECT websearch_to_tsquery('english', %(query)s) AS query
+        ),
+        hits AS (
+            (SELECT 'goal' AS kind, g.goal_id AS item_id, g.goal_id,
+                    ts_rank_cd(g.search_vector, q.query) AS rank,
+                    g.title || ': ' || COALESCE(g.description, '') AS body
+             FROM goals g, q
+             WHERE g.search_vector @@ q.query AND g.{column} = %(user_id)s
+             ORDER BY rank DESC
+             LIMIT %(limit)s)
+            UNION ALL
+            (SELECT 'task', t.task_id, t.goal_id, ts_rank_cd(t.search_vector, q.query) AS rank, t.description
+             FROM tasks t
+             JOIN goals g ON g.goal_id = t.goal_id, q
+             WHERE t.search_vector @@ q.query AND g.{column} = %(user_id)s
+             ORDER BY rank DESC
+             LIMIT %(limit)s)
+            UNION ALL
+            (SELECT 'feedback', f.feedback_id, f.goal_id, ts_rank_cd(f.search_vector, q.query) AS rank, f.feedback_text
+             FROM feedback f, q
+             WHERE f.search_vector @@ q.query AND f.{column} = %(user_id)s
+             ORDER BY rank DESC
+             LIMIT %(limit)s)
+        ),
+        top_hits AS (
+            SELECT * FROM hits
+            ORDER BY rank DESC, array_position(%(kinds)s::text[], kind), item_id
+            LIMIT %(limit)s
+        )
+        SELECT
+            h.kind, h.item_id, h.goal_id, g.title AS goal_title, h.rank,
+            ts_headline('english', h.body, q.query, 'StartSel=**, StopSel=**, MaxWords=30, MinWords=10') AS snippet
+        FROM top_hits h
+        CROSS JOIN q
+        LEFT JOIN goals g ON g.goal_id = h.goal_id
+        ORDER BY h.rank DESC, array_position(%(kinds)s::text[], h.kind), h.item_id;
+    """
+    params = {'query': query, 'user_id': user_id, 'limit': limit, 'kinds': SEARCH_KINDS}
+    try:
+        with db_connection(read_only=True) as conn:
+            return pd.read_sql(sql, conn, params=params)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error searching: {error}")
+        return pd.DataFrame()
+
+@instrumented
+def set_manager(user_id: int, manager_id: Optional[int]) -> bool:
+    """
+    Changes who a user reports to (None makes them a root). Triggers move their
+    whole subtree in user_hierarchy; moving a user under one of their own reports
+    is rejected. Returns True on success.
+    """
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("UPDATE users SET manager_id = %s WHERE user_id = %s;", (manager_id, user_id))
+            invalidate_cache(cur, ["users"])
+            conn.commit()
+        return True
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error changing manager: {error}")
+        return False
+
+@instrumented
+def get_subtree_metrics(user_id: int) -> Dict[str, Any]:
+    """
+    Dashboard metrics over the goals of everyone below a user in the org tree
+    (direct and skip-level reports), plus 'team_size'. Status counts are summed
+    from goal_status_counts; only open goals are scanned for the date-dependent counts.
+    """
+    query = """
+        WITH team AS (
+            SELECT descendant_id AS user_id
+            FROM user_hierarchy
+            WHERE ancestor_id = %(user_id)s AND depth > 0
+        ),
+        status_counts AS (
+            SELECT c.status, SUM(c.goal_count) AS goal_count
+            FROM team
+            JOIN goal_status_counts c ON c.user_id = team.user_id AND c.scope = 'Employee'
+            GROUP BY c.status
+        ),
+        open_goals AS (
+            SELECT
+                COUNT(*) FILTER (WHERE g.due_date < CURRENT_DATE) AS overdue_goals,
+                COUNT(*) FILTER (
+                    WHERE g.due_date BETWEEN CURRENT_DATE AND date_trunc('week', CURRENT_DATE)::date + 6
+                ) AS due_this_week
+            FROM team
+            JOIN goals g ON g.employee_id = team.user_id AND g.status IN ('Draft', 'In Progress')
+        )
+        SELECT
+            (SELECT COUNT(*) FROM team) AS team_size,
+            (SELECT COALESCE(json_object_agg(status, goal_count), '{}') FROM status_counts) AS status_counts,
+            open_goals.overdue_goals,
+            open_goals.due_this_week
+        FROM open_goals;
+    """
+    try:
+        with db_connection(read_only=True) as conn, conn.cursor() as cur:
+            cur.execute(query, {'user_id': user_id})
+            team_size, counts, overdue_goals, due_this_week = cur.fetchone()
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching team metrics: {error}")
+        return {}
+
+    status_counts = {status: int(counts.get(status, 0)) for status in GOAL_STATUSES}
+    return {
+        'team_size': team_size,
+        'total_goals': sum(status_counts.values()),
+        'completed_goals': status_counts['Completed'],
+        'status_counts': status_counts,
+        'overdue_goals': overdue_goals,
+        'due_this_week': due_this_week
+    }
+
+@instrumented
+def get_subtree_goals_page(user_id: int, after: Optional[Tuple] = None,
+                           page_size: int = PAGE_SIZE) -> Tuple[pd.DataFrame, Optional[Tuple]]:
+    """
+    Fetches one page of the goals of everyone below a user in the org tree, ordered by
+    (employee_id, due_date, goal_id) so each page walks the closure and goal indexes
+    in order. Returns the page and the cursor for the next one (None on the last page).
+    """
+    after_clause = ""
+    params = {'user_id': user_id, 'limit': page_size + 1}
+    if after is not None:
+        params['after_employee'], params['after_due'], params['after_id'] = after
+        after_clause = """
+              AND h.descendant_id >= %(after_employee)s
+              AND (g.employee_id, COALESCE(g.due_date, 'infinity'::date), g.goal_id)
+                  > (%(after_employee)s, COALESCE(%(after_due)s::date, 'infinity'::date), %(after_id)s)"""
+    query = f"""
+        SELECT
+            g.goal_id, g.title, g.description, g.due_date, g.status, e.name AS employee_name,
+            m.name AS manager_name, g.task_count, g.approved_count,
+            (100.0 * g.approved_count / NULLIF(g.task_count, 0))::float8 AS progress_pct, g.employee_id
+        FROM user_hierarchy h
+        JOIN goals g ON g.employee_id = h.descendant_id
+        JOIN users e ON e.user_id = g.employee_id
+        LEFT JOIN users m ON m.user_id = g.manager_id
+        WHERE h.ancestor_id = %(user_id)s AND h.depth > 0{after_clause}
+        ORDER BY g.employee_id, COALESCE(g.due_date, 'infinity'::date), g.goal_id
+        LIMIT %(limit)s;
+    """
+    try:
+        with db_connection(read_only=True) as conn:
+            df = pd.read_sql(query, conn, params=params)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching team goals: {error}")
+        return pd.DataFrame(), None
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (int(last['employee_id']), _keyset_value(last['due_date']), int(last['goal_id']))
+    return df, next_cursor
+
+@instrumented
+def get_subtree_feedback_page(user_id: int, after: Optional[Tuple] = None,
+                              page_size: int = PAGE_SIZE) -> Tuple[pd.DataFrame, Optional[Tuple]]:
+    """
+    Fetches one page of feedback given to anyone below a user in the org tree, newest
+    first by (feedback_date, feedback_id). Returns the page and the next cursor.
+    """
+    after_clause = ""
+    params = {'user_id': user_id, 'limit': page_size + 1}
+    if after is not None:
+        params['after_date'], params['after_id'] = after
+        after_clause = """
+          AND (f.feedback_date, f.feedback_id) < (%(after_date)s::timestamptz, %(after_id)s)"""
+    query = f"""
+        SELECT
+            f.feedback_id, f.feedback_date, f.feedback_text, e.name AS employee_name,
+            u.name AS manager_name, g.title AS goal_title
+        FROM feedback f
+        JOIN user_hierarchy h ON h.descendant_id = f.employee_id AND h.ancestor_id = %(user_id)s AND h.depth > 0
+        JOIN users e ON e.user_id = f.employee_id
+        JOIN users u ON u.user_id = f.manager_id
+        JOIN goals g ON g.goal_id = f.goal_id
+        WHERE TRUE{after_clause}
+        ORDER BY f.feedback_date DESC, f.feedback_id DESC
+        LIMIT %(limit)s;
+    """
+    try:
+        with db_connection(read_only=True) as conn:
+            df = pd.read_sql(query, conn, params=params)
+    except (Exception, psycopg2.Error) as error:
+        st.error(f"Error fetching team feedback: {error}")
+        return pd.DataFrame(), None
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (_keyset_value(last['feedback_date']), int(last['feedback_id']))
+    return df, next_cursor
@@ -0,0 +1,260 @@
+"""
+Asynchronous mirror of the backend read functions, built on asyncpg.
+
+Only reads are mirrored: writes stay in backend.py, which also invalidates the
+result cache and records writes for read-your-writes routing. Reads here go
+to the primary and bypass the result cache.
+
+`load_page` runs the independent queries a page needs concurrently on a
+shared asyncpg pool, so page latency approaches that of the slowest query
+rather than the sum of all of them. The pool lives on a dedicated event loop
+thread, letting synchronous callers such as Streamlit scripts share it
+through `run` / `load_page_sync`.
+"""
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+import pandas as pd
+
+import backend as db
+import instrumentation
+
+_loop = None
+_loop_lock = threading.Lock()
+_pool = None
+_pool_lock = None  # asyncio.Lock, created on the background loop
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Returns the process-wide event loop thread that owns the async pool."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="backend-async-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run(coro):
+    """Runs a coroutine on the shared background loop and waits for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+
+async def _init_connection(conn):
+    await conn.set_type_codec('json', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+
+async def get_pool() -> asyncpg.Pool:
+    """Returns the shared asyncpg pool, creating it on first use."""
+    global _pool, _pool_lock
+    if _pool is None:
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    host=db.DB_HOST,
+                    port=db.DB_PORT,
+                    database=db.DB_NAME,
+                    user=db.DB_USER,
+                    password=db.DB_PASSWORD,
+                    min_size=db.DB_POOL_MIN_SIZE,
+                    max_size=db.DB_POOL_MAX_SIZE,
+                    timeout=db.DB_CONNECT_TIMEOUT,
+                    init=_init_connection
+                )
+    return _pool
+
+
+async def _timed_fetch(label: str, method: str, query: str, *args):
+    """Acquires a connection and runs conn.<method>, recording checkout and execute times under `label`."""
+    pool = await get_pool()
+    started = time.perf_counter()
+    async with pool.acquire(timeout=db.DB_POOL_TIMEOUT) as conn:
+        instrumentation.record_connect(time.perf_counter() - started, label)
+        started = time.perf_counter()
+        error = True
+        result = None
+        try:
+            result = await getattr(conn, method)(query, *args)
+            error = False
+            return result
+        finally:
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            instrumentation.record_query(label, query, rows, time.perf_counter() - started, error)
+
+
+async def _fetch_frame(label: str, query: str, columns: List[str], *args) -> pd.DataFrame:
+    rows = await _timed_fetch(label, 'fetch', query, *args)
+    return pd.DataFrame([tuple(row) for row in rows], columns=columns)
+
+
+async def get_users() -> pd.DataFrame:
+    """Fetches all users for login and selection."""
+    return await _fetch_frame(
+        'get_users',
+        "SELECT user_id, name, role FROM users ORDER BY name;",
+        ['user_id', 'name', 'role']
+    )
+
+
+async def get_employees() -> pd.DataFrame:
+    """Fetches all employees for manager assignment."""
+    return await _fetch_frame(
+        'get_employees',
+        "SELECT user_id, name FROM users WHERE role = 'Employee' ORDER BY name;",
+        ['user_id', 'name']
+    )
+
+
+async def get_dashboard_metrics(user_id: int, role: str) -> Dict[str, Any]:
+    """
+    Calculates the dashboard metrics in one query. Like backend.get_dashboard_metrics,
+    status counts come from goal_status_counts when db.USE_GOAL_SUMMARY is set.
+    """
+    column = db.ROLE_COLUMNS.get(role, 'employee_id')
+    scope = 'Manager' if role == 'Manager' else 'Employee'
+    if db.USE_GOAL_SUMMARY:
+        query = f"""
+            SELECT
+                (SELECT COALESCE(json_object_agg(status, goal_count), '{{}}')
+                 FROM goal_status_counts WHERE user_id = $1 AND scope = $2) AS status_counts,
+                COUNT(*) FILTER (WHERE due_date < CURRENT_DATE) AS overdue_goals,
+                COUNT(*) FILTER (
+                    WHERE due_date BETWEEN CURRENT_DATE AND date_trunc('week', CURRENT_DATE)::date + 6
+                ) AS due_this_week
+            FROM goals
+            WHERE {column} = $1 AND status IN ('Draft', 'In Progress');
+        """
+        args = (user_id, scope)
+    else:
+        query = f"""
+            SELECT
+                json_build_object(
+                    'Draft', COUNT(*) FILTER (WHERE status = 'Draft'),
+                    'In Progress', COUNT(*) FILTER (WHERE status = 'In Progress'),
+                    'Completed', COUNT(*) FILTER (WHERE status = 'Completed'),
+                    'Cancelled', COUNT(*) FILTER (WHERE status = 'Cancelled')
+                ) AS status_counts,
+                COUNT(*) FILTER (WHERE due_date < CURRENT_DATE AND status IN ('Draft', 'In Progress')) AS overdue_goals,
+                COUNT(*) FILTER (
+                    WHERE due_date BETWEEN CURRENT_DATE AND date_trunc('week', CURRENT_DATE)::date + 6
+                      AND status IN ('Draft', 'In Progress')
+                ) AS due_this_week
+            FROM goals
+            WHERE {column} = $1;
+        """
+        args = (user_id,)
+    row = await _timed_fetch('get_dashboard_metrics', 'fetchrow', query, *args)
+
+    status_counts = {status: int(row['status_counts'].get(status, 0)) for status in db.GOAL_STATUSES}
+    return {
+        'total_goals': sum(status_counts.values()),
+        'completed_goals': status_counts['Completed'],
+        'status_counts': status_counts,
+        'overdue_goals': row['overdue_goals'],
+        'due_this_week': row['due_this_week']
+    }
+
+
+async def get_goals(user_id: int, role: str) -> pd.DataFrame:
+    """Fetches goals based on the user's role."""
+    if role == 'Manager':
+        query = """
+            SELECT
+                g.goal_id, g.title, g.description, g.due_date, g.status, u_emp.name AS employee_name,
+                g.task_count, g.approved_count, (100.0 * g.approved_count / NULLIF(g.task_count, 0))::float8 AS progress_pct,
+                g.manager_id, g.employee_id
+            FROM goals g
+            JOIN users u_emp ON g.employee_id = u_emp.user_id
+            WHERE g.manager_id = $1;
+        """
+        name_column = 'employee_name'
+    else:
+        query = """
+            SELECT
+                g.goal_id, g.title, g.description, g.due_date, g.status, u_mgr.name AS manager_name,
+                g.task_count, g.approved_count, (100.0 * g.approved_count / NULLIF(g.task_count, 0))::float8 AS progress_pct,
+                g.manager_id, g.employee_id
+            FROM goals g
+            JOIN users u_mgr ON g.manager_id = u_mgr.user_id
+            WHERE g.employee_id = $1;
+        """
+        name_column = 'manager_name'
+    columns = ['goal_id', 'title', 'description', 'due_date', 'status', name_column,
+               'task_count', 'approved_count', 'progress_pct', 'manager_id', 'employee_id']
+    return await _fetch_frame('get_goals', query, columns, user_id)
+
+
+async def get_tasks_for_goal(goal_id: int) -> pd.DataFrame:
+    """Fetches tasks for a specific goal."""
+    return await _fetch_frame(
+        'get_tasks_for_goal',
+        "SELECT task_id, description, is_approved FROM tasks WHERE goal_id = $1 ORDER BY task_id;",
+        ['task_id', 'description', 'is_approved'],
+        goal_id
+    )
+
+
+async def get_performance_history(employee_id: int) -> Dict[str, Any]:
+    """Retrieves an employee's goals and feedback, running both queries concurrently."""
+    goals_query = """
+        SELECT
+            g.goal_id, g.title, g.description, g.due_date, g.status, u.name AS manager_name
+        FROM goals g
+        JOIN users u ON g.manager_id = u.user_id
+        WHERE g.employee_id = $1
+        ORDER BY g.due_date DESC;
+    """
+    feedback_query = """
+        SELECT
+            f.feedback_date, f.feedback_text, u.name AS manager_name, g.title AS goal_title
+        FROM feedback f
+        JOIN users u ON f.manager_id = u.user_id
+        JOIN goals g ON f.goal_id = g.goal_id
+        WHERE f.employee_id = $1
+        ORDER BY f.feedback_date DESC;
+    """
+    goals_df, feedback_df = await asyncio.gather(
+        _fetch_frame('get_performance_history', goals_query, ['goal_id', 'title', 'description', 'due_date', 'status', 'manager_name'], employee_id),
+        _fetch_frame('get_performance_history', feedback_query, ['feedback_date', 'feedback_text', 'manager_name', 'goal_title'], employee_id)
+    )
+    return {'goals': goals_df, 'feedback': feedback_df}
+
+
+async def load_page(user_id: int, role: str, goal_id: Optional[int] = None,
+                    employee_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Loads every section of a user's page concurrently.
+
+    Returns a dict with 'users', 'metrics' and 'goals', plus 'employees' for
+    managers, 'tasks' when `goal_id` is given and 'history' for `employee_id`
+    (managers) or the user themself (employees). Query errors propagate.
+    """
+    sections = {
+        'users': get_users(),
+        'metrics': get_dashboard_metrics(user_id, role),
+        'goals': get_goals(user_id, role),
+    }
+    if role == 'Manager':
+        sections['employees'] = get_employees()
+    if goal_id is not None:
+        sections['tasks'] = get_tasks_for_goal(goal_id)
+    history_employee_id = employee_id if role == 'Manager' else user_id
+    if history_employee_id is not None:
+        sections['history'] = get_performance_history(history_employee_id)
+
+    results = await asyncio.gather(*sections.values())
+    return dict(zip(sections.keys(), results))
+
+
+def load_page_sync(user_id: int, role: str, goal_id: Optional[int] = None,
+                   employee_id: Optional[int] = None) -> Dict[str, Any]:
+    """Blocking wrapper around `load_page` for synchronous callers."""
+    return run(load_page(user_id, role, goal_id, employee_id))
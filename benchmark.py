@@ -0,0 +1,303 @@
+"""
+Repeatable latency and throughput benchmarks for the backend functions.
+
+Starts a throwaway PostgreSQL instance (initdb + pg_ctl on a free port),
+applies the migrations, seeds it with seed.py at each requested scale and
+times the backend functions against it: p50/p95/p99 latency, mean and
+single-client throughput. Writes go through the real trigger path
+(goal_status_counts, completion feedback, analytics change tracking).
+Results are written as JSON and can be compared against a saved baseline.
+
+Usage:
+    python benchmark.py                                   # 1k, 100k and 1M goals
+    python benchmark.py --scales 1000,100000 --iterations 500 --output results.json
+    python benchmark.py --baseline baseline.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import backend as db
+import instrumentation
+import migrate
+import seed
+
+DEFAULT_SCALES = (1_000, 100_000, 1_000_000)
+
+# Seed volumes per goal, so every scale has the same shape as production data
+GOALS_PER_USER = 40
+TASKS_PER_GOAL = 3
+FEEDBACK_PER_GOAL = 0.25
+
+SAMPLE_SIZE = 200  # distinct users / goals the read benchmarks rotate through
+
+
+class TemporaryPostgres:
+    """A throwaway PostgreSQL cluster in a temporary directory, stopped and removed on exit."""
+
+    def __init__(self, pg_bin: Optional[str] = None):
+        self.pg_bin = pg_bin
+        self.port = None
+        self.directory = None
+
+    def _tool(self, name: str) -> str:
+        path = os.path.join(self.pg_bin, name) if self.pg_bin else shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise RuntimeError(f"{name} not found; put the PostgreSQL bin directory on PATH or pass --pg-bin.")
+        return path
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(("localhost", 0))
+            return sock.getsockname()[1]
+
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp(prefix="epms-bench-")
+        data_dir = os.path.join(self.directory, "data")
+        self.port = self._free_port()
+        subprocess.run(
+            [self._tool("initdb"), "-D", data_dir, "-U", "postgres", "--auth=trust", "--encoding=UTF8"],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        # Durability is irrelevant for a throwaway cluster; keep fsync from dominating write timings.
+        options = (f"-p {self.port} -k {self.directory} -c listen_addresses=localhost "
+                   f"-c fsync=off -c full_page_writes=off -c synchronous_commit=off")
+        subprocess.run(
+            [self._tool("pg_ctl"), "-D", data_dir, "-l", os.path.join(self.directory, "postgres.log"),
+             "-o", options, "-w", "start"],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            subprocess.run(
+                [self._tool("pg_ctl"), "-D", os.path.join(self.directory, "data"), "-m", "fast", "-w", "stop"],
+                check=False, stdout=subprocess.DEVNULL
+            )
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _use_database(port: int, name: str):
+    """Points the backend at a fresh database on the benchmark cluster."""
+    import psycopg2
+
+    db.close_pool()
+    admin = psycopg2.connect(host="localhost", port=port, user="postgres", dbname="postgres")
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{name}";')
+        cur.execute(f'CREATE DATABASE "{name}";')
+    admin.close()
+    db.DB_HOST, db.DB_PORT, db.DB_NAME, db.DB_USER, db.DB_PASSWORD = "localhost", port, name, "postgres", ""
+
+
+def seed_scale(goals: int, seed_value: int) -> Dict[str, Any]:
+    """Migrates and seeds the current database with `goals` goals and proportional other tables."""
+    volumes = {
+        'users': max(20, goals // GOALS_PER_USER),
+        'goals': goals,
+        'tasks': goals * TASKS_PER_GOAL,
+        'feedback': int(goals * FEEDBACK_PER_GOAL),
+    }
+    started = time.monotonic()
+    with db.db_connection() as conn:
+        migrate.apply_migrations(conn)
+        seed.seed(conn, volumes['users'], volumes['goals'], volumes['tasks'], volumes['feedback'],
+                  seed_value=seed_value)
+    volumes['seed_seconds'] = round(time.monotonic() - started, 2)
+    return volumes
+
+
+def _sample_arguments(rng: np.random.Generator) -> Dict[str, List[int]]:
+    """Picks the managers, employees and goals the benchmarks rotate through."""
+    with db.db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT DISTINCT manager_id FROM goals ORDER BY 1 LIMIT 10000;")
+        managers = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT DISTINCT employee_id FROM goals ORDER BY 1 LIMIT 10000;")
+        employees = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT MIN(goal_id), MAX(goal_id) FROM goals;")
+        low, high = cur.fetchone()
+    return {
+        'managers': rng.choice(managers, size=min(SAMPLE_SIZE, len(managers)), replace=False).tolist(),
+        'employees': rng.choice(employees, size=min(SAMPLE_SIZE, len(employees)), replace=False).tolist(),
+        'goals': (low + rng.choice(high - low + 1, size=min(SAMPLE_SIZE, high - low + 1), replace=False)).tolist(),
+    }
+
+
+def benchmark_cases(args: Dict[str, List[int]]) -> Dict[str, Callable[[int], Any]]:
+    """Returns {name: call(i)}; the i-th call rotates through the sampled arguments."""
+    managers, employees, goals = args['managers'], args['employees'], args['goals']
+    due = date.today() + timedelta(days=30)
+    with db.db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT manager_id, employee_id FROM goals WHERE employee_id = ANY(%s);", (employees,))
+        pairs = sorted(set(cur.fetchall()))
+
+    def pick(values, i):
+        return values[i % len(values)]
+
+    statuses = ['Completed', 'In Progress']  # alternate so every update changes status and fires the triggers
+    return {
+        'get_goals[Manager]': lambda i: db.get_goals(pick(managers, i), 'Manager'),
+        'get_goals[Employee]': lambda i: db.get_goals(pick(employees, i), 'Employee'),
+        'get_dashboard_metrics[Manager]': lambda i: db.get_dashboard_metrics(pick(managers, i), 'Manager'),
+        'get_dashboard_metrics[Employee]': lambda i: db.get_dashboard_metrics(pick(employees, i), 'Employee'),
+        'get_tasks_for_goal': lambda i: db.get_tasks_for_goal(pick(goals, i)),
+        'get_performance_history': lambda i: db.get_performance_history(pick(employees, i)),
+        'add_goal': lambda i: db.add_goal(f"Benchmark goal {i}", "Created by benchmark.py", due, *pick(pairs, i)),
+        'add_task': lambda i: db.add_task(pick(goals, i), f"Benchmark task {i}"),
+        'update_goal_status': lambda i: db.update_goal_status(pick(goals, i), statuses[(i // len(goals)) % 2]),
+    }
+
+
+def measure(call: Callable[[int], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    """Times `iterations` sequential calls after `warmup` untimed ones."""
+    for i in range(warmup):
+        call(i)
+    timings = np.empty(iterations)
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        trace = instrumentation.start_trace()
+        call_started = time.perf_counter()
+        call(warmup + i)
+        timings[i] = time.perf_counter() - call_started
+        # Backend functions report failures through st.error; failed statements show up in the trace.
+        errors += any(event['error'] for event in trace)
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) * 1000
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+        'mean_ms': round(timings.mean() * 1000, 3),
+        'throughput_per_s': round(iterations / elapsed, 1),
+    }
+
+
+def run_scale(port: int, goals: int, iterations: int, warmup: int, seed_value: int,
+              only: Optional[List[str]] = None) -> Dict[str, Any]:
+    _use_database(port, f"epms_bench_{goals}")
+    print(f"Seeding {goals:,} goals...", file=sys.stderr)
+    result = {'volumes': seed_scale(goals, seed_value), 'functions': {}}
+    cases = benchmark_cases(_sample_arguments(np.random.default_rng(seed_value)))
+    for name, call in cases.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        stats = measure(call, iterations, warmup)
+        result['functions'][name] = stats
+        print(f"  {name:<34} p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms  "
+              f"p99 {stats['p99_ms']:>9.2f} ms  {stats['throughput_per_s']:>8.1f}/s"
+              + (f"  ({stats['errors']} errors)" if stats['errors'] else ""),
+              file=sys.stderr)
+    return result
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], metric: str = 'p95_ms') -> List[Tuple[str, str, float, float, float]]:
+    """Returns (scale, function, baseline, current, relative change) for every function in both runs."""
+    rows = []
+    for scale, current in results['scales'].items():
+        previous = baseline.get('scales', {}).get(scale)
+        if previous is None:
+            continue
+        for name, stats in current['functions'].items():
+            before = previous['functions'].get(name, {}).get(metric)
+            if not before:
+                continue
+            rows.append((scale, name, before, stats[metric], (stats[metric] - before) / before))
+    return rows
+
+
+def _postgres_version() -> str:
+    with db.db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SHOW server_version;")
+        return cur.fetchone()[0]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the backend functions against a throwaway PostgreSQL.")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="comma-separated goal counts to seed and benchmark")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per function and scale")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed calls before measuring")
+    parser.add_argument("--only", help="comma-separated function name prefixes to run")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache enabled (measures cache hits)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and argument sampling")
+    parser.add_argument("--pg-bin", help="directory containing initdb and pg_ctl")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="previous results JSON to compare p95 latency against")
+    parser.add_argument("--max-regression", type=float, default=0.20,
+                        help="fail when p95 grows by more than this fraction versus the baseline")
+    args = parser.parse_args(argv)
+
+    db.CACHE_ENABLED = args.cache
+    instrumentation.configure(slow_query_ms=float('inf'))
+    scales = [int(s) for s in args.scales.split(",") if s]
+    only = args.only.split(",") if args.only else None
+
+    results = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'cache_enabled': args.cache,
+        },
+        'scales': {},
+    }
+    with TemporaryPostgres(args.pg_bin) as server:
+        for goals in scales:
+            results['scales'][str(goals)] = run_scale(server.port, goals, args.iterations, args.warmup,
+                                                      args.seed, only)
+            results['meta']['postgres'] = _postgres_version()
+        db.close_pool()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}.", file=sys.stderr)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = 0
+    print(f"\n{'scale':>9}  {'function':<34} {'baseline p95':>13} {'current p95':>12} {'change':>8}")
+    for scale, name, before, after, change in compare(results, baseline):
+        flag = ""
+        if change > args.max_regression:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{int(scale):>9,}  {name:<34} {before:>10.2f} ms {after:>9.2f} ms {change:>+8.0%}{flag}")
+    if regressions:
+        print(f"\n{regressions} function(s) regressed by more than {args.max_regression:.0%}.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Bulk import of goals and tasks, e.g. at the start of a quarterly cycle.
+
+Records are validated in Python, manager and employee names are resolved to
+user_ids in one query, and valid rows are loaded with COPY into a temporary
+staging table followed by one set-based INSERT. Invalid rows are reported
+with their row number and reason instead of aborting the import.
+
+Usage:
+    python bulk_import.py goals goals.csv [--rejects rejects.csv]
+    python bulk_import.py tasks tasks.csv [--rejects rejects.csv]
+
+Goal CSV columns: title, description, due_date (YYYY-MM-DD), status, manager_name, employee_name
+Task CSV columns: goal_id, description, is_approved
+"""
+import argparse
+import csv
+import io
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import backend as db
+
+GOAL_COLUMNS = ['title', 'description', 'due_date', 'status', 'manager_name', 'employee_name']
+TASK_COLUMNS = ['goal_id', 'description', 'is_approved']
+
+BATCH_SIZE = 50_000  # rows per COPY into the staging table
+
+_TRUE_VALUES = {'true', 't', 'yes', 'y', '1'}
+_FALSE_VALUES = {'false', 'f', 'no', 'n', '0', ''}
+
+
+@dataclass
+class ImportResult:
+    """Outcome of a bulk import: rows inserted and (row number, reason) for each reject."""
+    inserted: int = 0
+    rejects: List[Tuple[int, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        total = self.inserted + len(self.rejects)
+        return total / self.elapsed if self.elapsed else 0.0
+
+
+def read_csv_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields one dict per data row of a CSV file with a header row."""
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def _text(record: Dict[str, Any], key: str) -> str:
+    value = record.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _validate_goal(record: Dict[str, Any]) -> Tuple[Optional[tuple], Optional[str]]:
+    """Returns (row, None) for a valid goal record or (None, reason)."""
+    title = _text(record, 'title')
+    if not title:
+        return None, "title is required"
+    if len(title) > 255:
+        return None, "title is longer than 255 characters"
+
+    due_date = record.get('due_date')
+    if isinstance(due_date, str):
+        due_date = due_date.strip()
+        if due_date:
+            try:
+                due_date = date.fromisoformat(due_date)
+            except ValueError:
+                return None, f"invalid due_date {due_date!r} (expected YYYY-MM-DD)"
+        else:
+            due_date = None
+    elif due_date is not None and not isinstance(due_date, date):
+        return None, f"invalid due_date {due_date!r}"
+
+    status = _text(record, 'status') or 'Draft'
+    if status not in db.GOAL_STATUSES:
+        return None, f"invalid status {status!r}"
+
+    manager_name = _text(record, 'manager_name')
+    employee_name = _text(record, 'employee_name')
+    if not manager_name:
+        return None, "manager_name is required"
+    if not employee_name:
+        return None, "employee_name is required"
+
+    return (title, _text(record, 'description') or None, due_date, status, manager_name, employee_name), None
+
+
+def _validate_task(record: Dict[str, Any]) -> Tuple[Optional[tuple], Optional[str]]:
+    """Returns (row, None) for a valid task record or (None, reason)."""
+    try:
+        goal_id = int(_text(record, 'goal_id'))
+    except ValueError:
+        return None, f"invalid goal_id {record.get('goal_id')!r}"
+    description = _text(record, 'description')
+    if not description:
+        return None, "description is required"
+
+    approved = record.get('is_approved')
+    if not isinstance(approved, bool):
+        approved = _text(record, 'is_approved').lower()
+        if approved in _TRUE_VALUES:
+            approved = True
+        elif approved in _FALSE_VALUES:
+            approved = False
+        else:
+            return None, f"invalid is_approved {record.get('is_approved')!r}"
+    return (goal_id, description, approved), None
+
+
+def _resolve_users(cur, names: Iterable[str]) -> Dict[Tuple[str, str], List[int]]:
+    """Maps (name, role) to the matching user_ids with a single query."""
+    cur.execute(
+        "SELECT name, role, array_agg(user_id ORDER BY user_id) FROM users WHERE name = ANY(%s) GROUP BY name, role;",
+        (list(names),)
+    )
+    return {(name, role): ids for name, role, ids in cur.fetchall()}
+
+
+def _copy_rows(cur, table: str, columns: List[str], rows: List[tuple]):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def import_goals(records: Iterable[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> ImportResult:
+    """
+    Validates and inserts goals in one transaction. Each record needs title,
+    manager_name and employee_name; description, due_date and status
+    (default 'Draft') are optional. Row numbers in rejects start at 1.
+    """
+    started = time.monotonic()
+    result = ImportResult()
+    valid = []
+    for row_no, record in enumerate(records, start=1):
+        row, reason = _validate_goal(record)
+        if reason:
+            result.rejects.append((row_no, reason))
+        else:
+            valid.append((row_no,) + row)
+
+    with db.db_connection() as conn, conn.cursor() as cur:
+        names = {row[5] for row in valid} | {row[6] for row in valid}
+        users = _resolve_users(cur, names) if names else {}
+
+        staged = []
+        tags = set()
+        for row_no, title, description, due_date, status, manager_name, employee_name in valid:
+            manager_ids = users.get((manager_name, 'Manager'), [])
+            employee_ids = users.get((employee_name, 'Employee'), [])
+            if len(manager_ids) != 1:
+                reason = "unknown manager" if not manager_ids else "ambiguous manager name"
+                result.rejects.append((row_no, f"{reason} {manager_name!r}"))
+                continue
+            if len(employee_ids) != 1:
+                reason = "unknown employee" if not employee_ids else "ambiguous employee name"
+                result.rejects.append((row_no, f"{reason} {employee_name!r}"))
+                continue
+            staged.append((row_no, title, description, due_date, status, manager_ids[0], employee_ids[0]))
+            tags.update(db.goal_cache_tags(manager_ids[0], employee_ids[0]))
+
+        if staged:
+            cur.execute("""
+                CREATE TEMP TABLE goal_import_stage (
+                    row_no INTEGER,
+                    title VARCHAR(255),
+                    description TEXT,
+                    due_date DATE,
+                    status VARCHAR(20),
+                    manager_id INTEGER,
+                    employee_id INTEGER
+                ) ON COMMIT DROP;
+            """)
+            columns = ['row_no', 'title', 'description', 'due_date', 'status', 'manager_id', 'employee_id']
+            for start in range(0, len(staged), batch_size):
+                _copy_rows(cur, 'goal_import_stage', columns, staged[start:start + batch_size])
+            cur.execute("""
+                INSERT INTO goals (title, description, due_date, status, manager_id, employee_id)
+                SELECT title, description, due_date, status, manager_id, employee_id
+                FROM goal_import_stage
+                ORDER BY row_no;
+            """)
+            result.inserted = cur.rowcount
+            db.invalidate_cache(cur, sorted(tags))
+        conn.commit()
+
+    result.rejects.sort()
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def import_tasks(records: Iterable[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> ImportResult:
+    """
+    Validates and inserts tasks in one transaction. Each record needs goal_id
+    and description; is_approved is optional. Rows for missing goals are rejected.
+    """
+    started = time.monotonic()
+    result = ImportResult()
+    staged = []
+    for row_no, record in enumerate(records, start=1):
+        row, reason = _validate_task(record)
+        if reason:
+            result.rejects.append((row_no, reason))
+        else:
+            staged.append((row_no,) + row)
+
+    with db.db_connection() as conn, conn.cursor() as cur:
+        if staged:
+            cur.execute("""
+                CREATE TEMP TABLE task_import_stage (
+                    row_no INTEGER,
+                    goal_id INTEGER,
+                    description TEXT,
+                    is_approved BOOLEAN
+                ) ON COMMIT DROP;
+            """)
+            for start in range(0, len(staged), batch_size):
+                _copy_rows(cur, 'task_import_stage', ['row_no', 'goal_id', 'description', 'is_approved'],
+                           staged[start:start + batch_size])
+
+            cur.execute("""
+                SELECT s.row_no, s.goal_id
+                FROM task_import_stage s
+                WHERE NOT EXISTS (SELECT 1 FROM goals g WHERE g.goal_id = s.goal_id);
+            """)
+            for row_no, goal_id in cur.fetchall():
+                result.rejects.append((row_no, f"unknown goal_id {goal_id}"))
+
+            cur.execute("""
+                INSERT INTO tasks (goal_id, description, is_approved)
+                SELECT s.goal_id, s.description, s.is_approved
+                FROM task_import_stage s
+                JOIN goals g ON g.goal_id = s.goal_id
+                ORDER BY s.row_no;
+            """)
+            result.inserted = cur.rowcount
+
+            # The insert trigger updated each goal's task counters, which goal listings show
+            cur.execute("""
+                SELECT goal_id, manager_id, employee_id
+                FROM goals
+                WHERE goal_id IN (SELECT goal_id FROM task_import_stage);
+            """)
+            tags = set()
+            for goal_id, manager_id, employee_id in cur.fetchall():
+                tags.add(f"tasks:{goal_id}")
+                tags.update(db.goal_cache_tags(manager_id, employee_id))
+            db.invalidate_cache(cur, sorted(tags))
+        conn.commit()
+
+    result.rejects.sort()
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def write_rejects(path: str, rejects: List[Tuple[int, str]]):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['row', 'reason'])
+        writer.writerows(rejects)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import goals or tasks from a CSV file.")
+    parser.add_argument("kind", choices=["goals", "tasks"])
+    parser.add_argument("path", help="CSV file with a header row")
+    parser.add_argument("--rejects", help="write rejected rows (row number, reason) to this CSV file")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    importer = import_goals if args.kind == "goals" else import_tasks
+    result = importer(read_csv_records(args.path), batch_size=args.batch_size)
+
+    print(f"Inserted {result.inserted:,} {args.kind}, rejected {len(result.rejects):,} "
+          f"in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s).")
+    if args.rejects:
+        write_rejects(args.rejects, result.rejects)
+    else:
+        for row_no, reason in result.rejects[:20]:
+            print(f"  row {row_no}: {reason}")
+        if len(result.rejects) > 20:
+            print(f"  ... {len(result.rejects) - 20:,} more (use --rejects to save them all)")
+    return 0 if not result.rejects else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
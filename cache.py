@@ -0,0 +1,199 @@
+import functools
+import json
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# Tag that drops every entry; sent when a change touches too many tags to list
+ALL_TAGS = '*'
+
+# pg_notify payloads must stay below 8000 bytes
+_MAX_PAYLOAD = 7900
+
+
+class ResultCache:
+    """
+    Thread-safe read-through cache with a TTL and an LRU size bound.
+
+    Every entry carries a set of tags (e.g. "tasks:42") naming the data it was
+    built from, so a write can invalidate exactly the entries it affects.
+    Cached values are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._tag_index: Dict[str, set] = {}
+        self._generation = 0  # bumped on every invalidation
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def get(self, key) -> Tuple[bool, Any]:
+        """Returns (hit, value) for `key`, expiring stale entries."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, entry[0]
+
+    def generation(self) -> int:
+        """Returns a counter that changes whenever anything is invalidated."""
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, tags: Iterable[str], generation: Optional[int] = None):
+        """
+        Stores `value` under `key`. If `generation` is given and an invalidation
+        happened since it was read, the value may be stale and is not stored.
+        """
+        tags = frozenset(tags)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, tags: Iterable[str]):
+        """Drops every entry carrying any of `tags` ("*" drops everything)."""
+        tags = set(tags)
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+            if ALL_TAGS in tags:
+                self._entries.clear()
+                self._tag_index.clear()
+                return
+            for tag in tags:
+                for key in list(self._tag_index.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        self.invalidate([ALL_TAGS])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['entries'] = len(self._entries)
+        return snapshot
+
+    def cached(self, tags: Callable[..., Iterable[str]],
+               cacheable: Callable[[Any], bool] = lambda value: True,
+               enabled: Callable[[], bool] = lambda: True):
+        """
+        Decorator caching a function's result by its name and arguments.
+        `tags` receives the call's arguments and names the data the result depends on.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not enabled():
+                    return func(*args, **kwargs)
+                key = (func.__name__, args, tuple(sorted(kwargs.items())))
+                hit, value = self.get(key)
+                if hit:
+                    return value
+                generation = self.generation()
+                value = func(*args, **kwargs)
+                if cacheable(value):
+                    self.set(key, value, tags(*args, **kwargs), generation=generation)
+                return value
+            return wrapper
+        return decorator
+
+
+def publish_invalidation(cur, channel: str, tags: Iterable[str]):
+    """
+    Queues a NOTIFY listing `tags` on the cursor's transaction.
+    Postgres delivers it to every listening process only if the transaction commits.
+    """
+    payload = json.dumps(sorted(set(tags)))
+    if len(payload) > _MAX_PAYLOAD:
+        payload = json.dumps([ALL_TAGS])
+    cur.execute("SELECT pg_notify(%s, %s);", (channel, payload))
+
+
+class InvalidationListener(threading.Thread):
+    """
+    Background thread that LISTENs on a channel on its own connection and
+    invalidates the local cache for tags published by any process.
+    The whole cache is cleared after (re)connecting, since notifications
+    sent while disconnected are lost.
+    """
+
+    def __init__(self, connect: Callable[[], Any], cache: ResultCache, channel: str,
+                 poll_interval: float = 5.0, retry_delay: float = 5.0):
+        super().__init__(name=f"cache-listener-{channel}", daemon=True)
+        self._connect = connect
+        self._cache = cache
+        self._channel = channel
+        self._poll_interval = poll_interval
+        self._retry_delay = retry_delay
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self._channel}";')
+                self._cache.clear()
+                while not self._stopped.is_set():
+                    if select.select([conn], [], [], self._poll_interval) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._handle(conn.notifies.pop(0).payload)
+            except Exception as error:
+                logger.warning("Cache invalidation listener error: %s", error)
+                self._cache.clear()
+                self._stopped.wait(self._retry_delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+
+    def _handle(self, payload: str):
+        try:
+            tags = json.loads(payload)
+        except ValueError:
+            tags = [ALL_TAGS]
+        self._cache.invalidate(tags)
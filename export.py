@@ -0,0 +1,250 @@
+"""
+Memory-bounded export of org-wide performance history.
+
+Goals, tasks and feedback for all (or a filtered range of) employees are read
+through named server-side cursors and written chunk by chunk to CSV or
+Parquet, so memory use stays constant regardless of the export size. Work can
+be split across worker processes by employee_id range; each worker writes its
+own part files.
+
+Usage:
+    python export.py out/                                  # CSV, single process
+    python export.py out/ --format parquet --workers 4
+    python export.py out/ --min-employee-id 100 --max-employee-id 500
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+CHUNK_SIZE = 50_000
+
+# Each query takes the employee_id range as %(min_id)s / %(max_id)s (inclusive).
+EXPORT_QUERIES = {
+    'goals': """
+        SELECT
+            g.goal_id, g.title, g.description, g.due_date, g.status,
+            g.manager_id, m.name AS manager_name, g.employee_id, e.name AS employee_name
+        FROM goals g
+        LEFT JOIN users m ON m.user_id = g.manager_id
+        LEFT JOIN users e ON e.user_id = g.employee_id
+        WHERE g.employee_id BETWEEN %(min_id)s AND %(max_id)s
+        ORDER BY g.employee_id, g.goal_id;
+    """,
+    'tasks': """
+        SELECT t.task_id, t.goal_id, g.employee_id, t.description, t.is_approved
+        FROM tasks t
+        JOIN goals g ON g.goal_id = t.goal_id
+        WHERE g.employee_id BETWEEN %(min_id)s AND %(max_id)s
+        ORDER BY g.employee_id, t.goal_id, t.task_id;
+    """,
+    'feedback': """
+        SELECT f.feedback_id, f.goal_id, f.manager_id, f.employee_id, f.feedback_date, f.feedback_text
+        FROM feedback f
+        WHERE f.employee_id BETWEEN %(min_id)s AND %(max_id)s
+        ORDER BY f.employee_id, f.feedback_date, f.feedback_id;
+    """,
+}
+
+
+# Column types of each export, so every Parquet row group shares one schema even
+# when a nullable column is entirely NULL in the first chunk.
+EXPORT_COLUMN_TYPES = {
+    'goals': {
+        'goal_id': 'int32', 'title': 'string', 'description': 'string', 'due_date': 'date',
+        'status': 'string', 'manager_id': 'int32', 'manager_name': 'string',
+        'employee_id': 'int32', 'employee_name': 'string',
+    },
+    'tasks': {
+        'task_id': 'int32', 'goal_id': 'int32', 'employee_id': 'int32',
+        'description': 'string', 'is_approved': 'bool',
+    },
+    'feedback': {
+        'feedback_id': 'int32', 'goal_id': 'int32', 'manager_id': 'int32', 'employee_id': 'int32',
+        'feedback_date': 'timestamptz', 'feedback_text': 'string',
+    },
+}
+
+
+class CsvChunkWriter:
+    """Appends DataFrame chunks to one CSV file, writing the header once."""
+
+    def __init__(self, path: str, column_types: Optional[Dict[str, str]] = None):
+        self.path = path
+        self._header = True
+
+    def write(self, df: pd.DataFrame):
+        df.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        if self._header:
+            open(self.path, 'w').close()
+
+
+class ParquetChunkWriter:
+    """Appends DataFrame chunks as row groups of one Parquet file (requires pyarrow)."""
+
+    def __init__(self, path: str, column_types: Dict[str, str]):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        arrow_types = {
+            'int32': pyarrow.int32(),
+            'string': pyarrow.string(),
+            'bool': pyarrow.bool_(),
+            'date': pyarrow.date32(),
+            'timestamptz': pyarrow.timestamp('us', tz='UTC'),
+        }
+        self.schema = pyarrow.schema([(name, arrow_types[kind]) for name, kind in column_types.items()])
+        self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        table = self._pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, self.schema, compression='zstd')
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+WRITERS = {'csv': CsvChunkWriter, 'parquet': ParquetChunkWriter}
+
+
+def employee_id_range(conn, min_id: Optional[int] = None, max_id: Optional[int] = None) -> Tuple[int, int]:
+    """Resolves open-ended bounds to the actual employee_id range in goals and feedback."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT MIN(employee_id), MAX(employee_id)
+            FROM (
+                SELECT employee_id FROM goals
+                UNION ALL
+                SELECT employee_id FROM feedback
+            ) ids;
+        """)
+        low, high = cur.fetchone()
+    conn.rollback()
+    low = min_id if min_id is not None else (low or 0)
+    high = max_id if max_id is not None else (high or 0)
+    return low, high
+
+
+def split_range(low: int, high: int, parts: int) -> List[Tuple[int, int]]:
+    """Splits [low, high] into up to `parts` contiguous, non-empty inclusive ranges."""
+    parts = max(1, min(parts, high - low + 1))
+    size, extra = divmod(high - low + 1, parts)
+    ranges = []
+    start = low
+    for i in range(parts):
+        end = start + size - 1 + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def export_range(out_dir: str, fmt: str, min_id: int, max_id: int, part: int = 0,
+                 chunk_size: int = CHUNK_SIZE, tables: Tuple[str, ...] = tuple(EXPORT_QUERIES)) -> Dict[str, int]:
+    """
+    Exports every table for employee_ids in [min_id, max_id] to
+    `<out_dir>/<table>-part-<part>.<fmt>`. Returns rows written per table.
+    All tables are read in one REPEATABLE READ transaction, so the files of a
+    part come from a single snapshot (no tasks of goals missing from goals).
+    """
+    import backend as db
+
+    counts = {}
+    extension = 'csv' if fmt == 'csv' else 'parquet'
+    with db.db_connection(read_only=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;")
+        for table in tables:
+            writer = WRITERS[fmt](os.path.join(out_dir, f"{table}-part-{part:03d}.{extension}"),
+                                  EXPORT_COLUMN_TYPES[table])
+            started = time.monotonic()
+            rows = 0
+            try:
+                with conn.cursor(name=f"export_{table}_{uuid.uuid4().hex}") as cur:
+                    cur.itersize = chunk_size
+                    cur.execute(EXPORT_QUERIES[table], {'min_id': min_id, 'max_id': max_id})
+                    while True:
+                        batch = cur.fetchmany(chunk_size)
+                        if not batch:
+                            break
+                        writer.write(pd.DataFrame(batch, columns=[c[0] for c in cur.description]))
+                        rows += len(batch)
+                        rate = rows / max(time.monotonic() - started, 1e-9)
+                        print(f"[part {part}] {table}: {rows:,} rows ({rate:,.0f} rows/s)",
+                              file=sys.stderr, flush=True)
+            finally:
+                writer.close()
+            counts[table] = rows
+        conn.rollback()
+    return counts
+
+
+def _export_worker(args) -> Dict[str, int]:
+    return export_range(*args)
+
+
+def export(out_dir: str, fmt: str = 'csv', workers: int = 1, min_id: Optional[int] = None,
+           max_id: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Exports goals, tasks and feedback for employees in the given id range,
+    splitting the range across `workers` processes. Returns total rows per table.
+    """
+    import backend as db
+
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format {fmt!r}.")
+    os.makedirs(out_dir, exist_ok=True)
+    with db.db_connection(read_only=True) as conn:
+        low, high = employee_id_range(conn, min_id, max_id)
+
+    jobs = [(out_dir, fmt, start, end, part, chunk_size)
+            for part, (start, end) in enumerate(split_range(low, high, workers))]
+    if len(jobs) == 1:
+        results = [_export_worker(jobs[0])]
+    else:
+        # spawn gives each worker a fresh interpreter and its own connection pool
+        with multiprocessing.get_context('spawn').Pool(len(jobs)) as pool:
+            results = pool.map(_export_worker, jobs)
+
+    totals = {table: 0 for table in EXPORT_QUERIES}
+    for counts in results:
+        for table, rows in counts.items():
+            totals[table] += rows
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export goals, tasks and feedback for the whole organisation.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--workers", type=int, default=1, help="processes, each exporting an employee_id range")
+    parser.add_argument("--min-employee-id", type=int)
+    parser.add_argument("--max-employee-id", type=int)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    totals = export(args.out_dir, args.format, args.workers,
+                    args.min_employee_id, args.max_employee_id, args.chunk_size)
+    summary = ", ".join(f"{rows:,} {table}" for table, rows in totals.items())
+    print(f"Exported {summary} to {args.out_dir} in {time.monotonic() - started:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
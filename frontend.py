@@ -2,16 +2,78 @@ import streamlit as st
 import pandas as pd
 import sys
 import os
+import uuid
+import functools
 from datetime import date
 
 try:
     import backend as db
+    import analytics
+    from viewmodel import GoalOptions, UserOptions
 except ImportError:
     st.error("Error: Could not import backend.py. Please ensure both frontend.py and backend.py are in the same directory.")
     st.stop()
 
-# Initialize the database and tables
-db.create_tables_and_insert_data()
+query_trace = db.start_query_trace()
+# Lets the backend send this session's reads to the primary right after its own writes
+db.set_session_key(st.session_state.setdefault('session_key', uuid.uuid4().hex))
+
+@st.cache_resource
+def init_database():
+    """
+    Runs schema migrations once per process rather than on every rerun.
+    A failed start raises, which st.cache_resource does not cache, so the next rerun retries.
+    """
+    if not db.init_database():
+        raise RuntimeError("Database initialization failed.")
+    return True
+
+try:
+    init_database()
+except RuntimeError:
+    # backend.init_database has already shown the error
+    st.stop()
+
+def session_fragment(func):
+    """
+    st.fragment that re-identifies the session first: fragment reruns run on a
+    new thread where the backend's session key (read-your-writes routing) is unset.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        db.set_session_key(st.session_state['session_key'])
+        return func(*args, **kwargs)
+    return st.fragment(wrapper)
+
+# Goal listings carry trigger-maintained task counters; render progress as a bar
+PROGRESS_COLUMNS = {
+    'task_count': st.column_config.NumberColumn("Tasks"),
+    'progress_pct': st.column_config.ProgressColumn("Progress", format="%.0f%%", min_value=0, max_value=100)
+}
+
+def paged_table(key: str, fetch_page, drop_columns):
+    """
+    Renders one keyset-paginated page with Previous/Next buttons.
+    The cursor of every visited page is kept in session_state under `key`; the
+    buttons update it in a callback, so inside a fragment only that fragment reruns.
+    """
+    cursors = st.session_state.setdefault(key, [None])
+    page_df, next_cursor = fetch_page(cursors[-1])
+    if page_df.empty:
+        return False
+    st.dataframe(page_df.drop(drop_columns, axis=1), use_container_width=True,
+                 column_config=PROGRESS_COLUMNS)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(cursors) > 1:
+            st.button("Previous", key=f"{key}_prev", on_click=cursors.pop)
+    with col_page:
+        st.caption(f"Page {len(cursors)}")
+    with col_next:
+        if next_cursor is not None:
+            st.button("Next", key=f"{key}_next", on_click=cursors.append, args=(next_cursor,))
+    return True
 
 st.set_page_config(layout="wide")
 st.title("🎯 Performance Management System")
@@ -26,11 +88,10 @@ if users_df.empty:
     st.sidebar.error("No users found. Please check database.")
     st.stop()
 
-user_names = users_df['name'].tolist()
-selected_user_name = st.sidebar.selectbox("Select your name", user_names)
-selected_user_info = users_df[users_df['name'] == selected_user_name].iloc[0]
-user_id = int(selected_user_info['user_id'])
-user_role = selected_user_info['role']
+user_options = UserOptions.from_frame(users_df)
+user_id = st.sidebar.selectbox("Select your name", user_options.ids, format_func=user_options.name)
+selected_user_name = user_options.name(user_id)
+user_role = user_options.role(user_id)
 
 st.sidebar.success(f"Logged in as: {selected_user_name} ({user_role})")
 
@@ -42,156 +103,292 @@ st.markdown("---")
 
 metrics = db.get_dashboard_metrics(user_id, user_role)
 if metrics:
-    col1, col2 = st.columns(2)
+    col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
         st.metric(label="Total Goals", value=metrics['total_goals'])
     with col2:
         st.metric(label="Goals Completed", value=metrics['completed_goals'])
+    with col3:
+        st.metric(label="In Progress", value=metrics['status_counts']['In Progress'])
+    with col4:
+        st.metric(label="Overdue", value=metrics['overdue_goals'])
+    with col5:
+        st.metric(label="Due This Week", value=metrics['due_this_week'])
 else:
     st.error("Could not load dashboard metrics.")
 
+rollups_df = db.get_goal_rollups(user_id, user_role)
+if not rollups_df.empty:
+    st.subheader("Quarterly Trends")
+    latest = analytics.quarter_over_quarter(rollups_df.assign(user_id=user_id)).iloc[-1]
+
+    def rate_metric(column, label, container, delta_color="normal"):
+        value = latest[column]
+        change = latest[f"{column}_change"]
+        delta = None if pd.isna(change) else f"{change * 100:+.1f} pts"
+        container.metric(label=label, value="n/a" if pd.isna(value) else f"{value:.0%}",
+                         delta=delta, delta_color=delta_color)
+
+    col_rate1, col_rate2, col_rate3 = st.columns(3)
+    rate_metric('completion_rate', f"Completion Rate ({latest['quarter']:%Y} Q{(latest['quarter'].month - 1) // 3 + 1})", col_rate1)
+    rate_metric('on_time_rate', "On-time Rate", col_rate2)
+    rate_metric('cancellation_rate', "Cancellation Rate", col_rate3, delta_color="inverse")
+    st.line_chart(rollups_df.set_index('quarter')[['completion_rate', 'on_time_rate', 'cancellation_rate']])
+    st.caption(f"Precomputed by analytics.py; last refreshed {rollups_df['refreshed_at'].max():%Y-%m-%d %H:%M}.")
+
 # ==============================================================================
-# Goal & Progress Tracking
+# Sections
 # ==============================================================================
-st.header("📋 Goals & Progress Tracking")
-st.markdown("---")
+# Only the selected section runs, so its queries are issued the first time it is
+# viewed. Widgets inside a fragment rerun just that fragment; writes that change
+# the dashboard or the goals table (status, new goal) rerun the whole page.
+
+@session_fragment
+def search_section(user_id: int, user_role: str):
+    search_query = st.text_input(
+        "Search goals, tasks and feedback",
+        placeholder='e.g. certification, "q3 sales", training -security',
+        key="search_query"
+    )
+    if search_query:
+        results_df = db.search(user_id, user_role, search_query)
+        if results_df.empty:
+            st.info("No matches found.")
+        else:
+            for result in results_df.itertuples():
+                st.markdown(f"**{result.kind.title()}** · {result.goal_title}  \n{result.snippet}")
+
+@session_fragment
+def tasks_panel(goal_options: GoalOptions, user_role: str):
+    st.subheader("Tasks")
+    selected_goal_id = st.selectbox(
+        "Select a Goal",
+        options=goal_options.ids,
+        format_func=goal_options.title,
+        key="task_goal"
+    )
+    with st.form("add_task_form", clear_on_submit=True):
+        task_description = st.text_area("Task Description", key="task_desc")
+        submitted_task = st.form_submit_button("Add Task")
+        if submitted_task:
+            if task_description:
+                db.add_task(selected_goal_id, task_description)
+                st.success("Task added successfully!")
+            else:
+                st.error("Task description is required.")
+
+    # Read after the form so a task added in this run is already listed
+    tasks_df = db.get_tasks_for_goal(selected_goal_id)
+    if tasks_df.empty:
+        st.info("No tasks logged for this goal.")
+        return
+    approved = tasks_df['is_approved'].fillna(False).astype(bool)
+    st.progress(int(approved.sum()) / len(tasks_df), text=f"{int(approved.sum())} of {len(tasks_df)} tasks approved")
+    st.dataframe(tasks_df.drop('task_id', axis=1), use_container_width=True)
+
+    if user_role == 'Manager' and not approved.all():
+        pending_df = tasks_df[~approved]
+        pending = dict(zip(pending_df['task_id'].tolist(), pending_df['description'].tolist()))
+        with st.form("approve_tasks_form"):
+            task_ids_to_approve = st.multiselect(
+                "Tasks to approve",
+                options=list(pending),
+                format_func=pending.get,
+                key="approve_task_ids"
+            )
+            if st.form_submit_button("Approve Selected"):
+                approved_count = db.approve_tasks(task_ids_to_approve)
+                st.toast(f"Approved {approved_count} task(s).")
+                st.rerun(scope="fragment")
 
-goals_df = db.get_goals(user_id, user_role)
+@session_fragment
+def status_panel(goal_options: GoalOptions):
+    st.subheader("Update Goal Status")
+    with st.form("update_status_form"):
+        selected_goal_id_status = st.selectbox(
+            "Select a Goal",
+            options=goal_options.ids,
+            format_func=goal_options.title,
+            key="status_goal"
+        )
+        new_status = st.selectbox("New Status", ['Draft', 'In Progress', 'Completed', 'Cancelled'], key="new_status")
+        submitted_status = st.form_submit_button("Update Status")
+        if submitted_status:
+            db.update_goal_status(selected_goal_id_status, new_status)
+            st.toast("Goal status updated!")
+            # Status feeds the dashboard metrics and the goals table
+            st.rerun()
+
+@session_fragment
+def feedback_panel(goal_options: GoalOptions, user_id: int):
+    st.subheader("Provide Feedback")
+    with st.form("add_feedback_form", clear_on_submit=True):
+        selected_goal_id_feedback = st.selectbox(
+            "Select a Goal",
+            options=goal_options.ids,
+            format_func=goal_options.title,
+            key="feedback_goal"
+        )
+        feedback_text = st.text_area("Feedback Text", key="feedback_text")
+        submitted_feedback = st.form_submit_button("Add Feedback")
+        if submitted_feedback:
+            if feedback_text:
+                employee_id = goal_options.employee_id(selected_goal_id_feedback)
+                db.add_feedback(selected_goal_id_feedback, user_id, employee_id, feedback_text)
+                st.success("Feedback submitted!")
+            else:
+                st.error("Feedback text is required.")
+
+def goals_section(user_id: int, user_role: str):
+    goals_df = db.get_goals(user_id, user_role)
+    goal_options = GoalOptions.from_frame(goals_df)
+
+    if goals_df.empty:
+        st.info("No goals found for this user.")
+        if user_role == 'Manager':
+            st.write("You can set a new goal in the Set a New Goal section.")
+        return
 
-if not goals_df.empty:
     st.subheader(f"{selected_user_name}'s Goals")
-    st.dataframe(goals_df.drop('goal_id', axis=1), use_container_width=True)
+    st.dataframe(
+        goals_df.drop(['goal_id', 'manager_id', 'employee_id', 'approved_count'], axis=1),
+        use_container_width=True,
+        column_config=PROGRESS_COLUMNS
+    )
 
     # ==============================================================================
     # Add Task & Update Goal Status
     # ==============================================================================
     st.subheader("Manage Goals & Tasks")
-    
+
     col_task, col_status, col_feedback = st.columns(3)
-    
     with col_task:
-        st.subheader("Add Task to a Goal")
-        with st.form("add_task_form"):
-            selected_goal_id_task = st.selectbox(
-                "Select a Goal",
-                options=goals_df['goal_id'].tolist(),
-                format_func=lambda x: goals_df[goals_df['goal_id'] == x]['title'].iloc[0],
-                key="task_goal"
-            )
-            task_description = st.text_area("Task Description", key="task_desc")
-            submitted_task = st.form_submit_button("Add Task")
-            if submitted_task:
-                if task_description:
-                    db.add_task(selected_goal_id_task, task_description)
-                    st.success("Task added successfully!")
-                    st.experimental_rerun()
-                else:
-                    st.error("Task description is required.")
-        
-        st.subheader("Tasks for Selected Goal")
-        if selected_goal_id_task:
-            tasks_df = db.get_tasks_for_goal(selected_goal_id_task)
-            st.dataframe(tasks_df.drop('task_id', axis=1), use_container_width=True)
-            if tasks_df.empty:
-                st.info("No tasks logged for this goal.")
-
+        tasks_panel(goal_options, user_role)
     if user_role == 'Manager':
         with col_status:
-            st.subheader("Update Goal Status")
-            with st.form("update_status_form"):
-                selected_goal_id_status = st.selectbox(
-                    "Select a Goal",
-                    options=goals_df['goal_id'].tolist(),
-                    format_func=lambda x: goals_df[goals_df['goal_id'] == x]['title'].iloc[0],
-                    key="status_goal"
-                )
-                new_status = st.selectbox("New Status", ['Draft', 'In Progress', 'Completed', 'Cancelled'], key="new_status")
-                submitted_status = st.form_submit_button("Update Status")
-                if submitted_status:
-                    db.update_goal_status(selected_goal_id_status, new_status)
-                    st.success("Goal status updated!")
-                    st.experimental_rerun()
-    
-    with col_feedback:
-        if user_role == 'Manager':
-            st.subheader("Provide Feedback")
-            with st.form("add_feedback_form"):
-                selected_goal_id_feedback = st.selectbox(
-                    "Select a Goal",
-                    options=goals_df['goal_id'].tolist(),
-                    format_func=lambda x: goals_df[goals_df['goal_id'] == x]['title'].iloc[0],
-                    key="feedback_goal"
-                )
-                feedback_text = st.text_area("Feedback Text", key="feedback_text")
-                submitted_feedback = st.form_submit_button("Add Feedback")
-                if submitted_feedback:
-                    if feedback_text:
-                        employee_id = goals_df[goals_df['goal_id'] == selected_goal_id_feedback]['employee_id'].iloc[0]
-                        db.add_feedback(selected_goal_id_feedback, user_id, employee_id, feedback_text)
-                        st.success("Feedback submitted!")
-                        st.experimental_rerun()
-                    else:
-                        st.error("Feedback text is required.")
+            status_panel(goal_options)
+        with col_feedback:
+            feedback_panel(goal_options, user_id)
 
-else:
-    st.info("No goals found for this user.")
-    if user_role == 'Manager':
-        st.write("You can set a new goal below.")
-
-# ==============================================================================
-# Goal & Reporting (Manager-only)
-# ==============================================================================
-if user_role == 'Manager':
-    st.header("🎯 Set a New Goal")
-    st.markdown("---")
-    
+def new_goal_section(user_id: int):
     employees_df = db.get_employees()
-    if not employees_df.empty:
-        with st.form("set_goal_form"):
-            goal_title = st.text_input("Goal Title")
-            goal_description = st.text_area("Goal Description")
-            goal_due_date = st.date_input("Due Date", date.today())
-            selected_employee_id = st.selectbox(
-                "Assign to Employee",
-                options=employees_df['user_id'].tolist(),
-                format_func=lambda x: employees_df[employees_df['user_id'] == x]['name'].iloc[0]
-            )
-            submitted = st.form_submit_button("Set Goal")
-            if submitted:
-                if goal_title:
-                    db.add_goal(goal_title, goal_description, goal_due_date, user_id, selected_employee_id)
-                    st.success("New goal created!")
-                    st.experimental_rerun()
-                else:
-                    st.error("Goal title is required.")
-    else:
+    employee_options = UserOptions.from_frame(employees_df)
+    if employees_df.empty:
         st.warning("No employees available to assign goals to.")
+        return
 
-# ==============================================================================
-# Performance History (Reporting)
-# ==============================================================================
-st.header("📜 Performance History")
-st.markdown("---")
+    with st.form("set_goal_form", clear_on_submit=True):
+        goal_title = st.text_input("Goal Title")
+        goal_description = st.text_area("Goal Description")
+        goal_due_date = st.date_input("Due Date", date.today())
+        selected_employee_id = st.selectbox(
+            "Assign to Employee",
+            options=employee_options.ids,
+            format_func=employee_options.name
+        )
+        submitted = st.form_submit_button("Set Goal")
+        if submitted:
+            if goal_title:
+                db.add_goal(goal_title, goal_description, goal_due_date, user_id, selected_employee_id)
+                st.toast("New goal created!")
+                # The dashboard metrics above were rendered before the insert
+                st.rerun()
+            else:
+                st.error("Goal title is required.")
 
-if user_role == 'Manager':
-    employee_for_report_id = st.selectbox(
-        "Select an Employee for Performance Report",
-        options=employees_df['user_id'].tolist(),
-        format_func=lambda x: employees_df[employees_df['user_id'] == x]['name'].iloc[0]
-    )
-    performance_data = db.get_performance_history(employee_for_report_id)
-else:
-    performance_data = db.get_performance_history(user_id)
+@session_fragment
+def history_section(user_id: int, user_role: str):
+    if user_role == 'Manager':
+        employee_options = UserOptions.from_frame(db.get_employees())
+        history_employee_id = st.selectbox(
+            "Select an Employee for Performance Report",
+            options=employee_options.ids,
+            format_func=employee_options.name,
+            key="history_employee"
+        )
+    else:
+        history_employee_id = user_id
+    if history_employee_id is None:
+        st.info("No employees found.")
+        return
 
-if performance_data:
     st.subheader("Goals History")
-    if not performance_data['goals'].empty:
-        st.dataframe(performance_data['goals'].drop('goal_id', axis=1), use_container_width=True)
-    else:
+    has_goals = paged_table(
+        f"history_goals_{history_employee_id}",
+        lambda after: db.get_goals_page(history_employee_id, 'Employee', after=after, descending=True),
+        ['goal_id', 'approved_count']
+    )
+    if not has_goals:
         st.info("No goals found in history.")
 
     st.subheader("Feedback History")
-    if not performance_data['feedback'].empty:
-        st.dataframe(performance_data['feedback'], use_container_width=True)
-    else:
+    has_feedback = paged_table(
+        f"history_feedback_{history_employee_id}",
+        lambda after: db.get_feedback_page(history_employee_id, after=after),
+        ['feedback_id']
+    )
+    if not has_feedback:
         st.info("No feedback found in history.")
+
+@session_fragment
+def organization_section(user_id: int):
+    team_metrics = db.get_subtree_metrics(user_id)
+    if not team_metrics.get('team_size'):
+        st.info("Nobody reports to you yet.")
+        return
+
+    col_org1, col_org2, col_org3, col_org4, col_org5 = st.columns(5)
+    with col_org1:
+        st.metric(label="People", value=team_metrics['team_size'])
+    with col_org2:
+        st.metric(label="Total Goals", value=team_metrics['total_goals'])
+    with col_org3:
+        st.metric(label="Goals Completed", value=team_metrics['completed_goals'])
+    with col_org4:
+        st.metric(label="Overdue", value=team_metrics['overdue_goals'])
+    with col_org5:
+        st.metric(label="Due This Week", value=team_metrics['due_this_week'])
+
+    st.subheader("Organization Goals")
+    if not paged_table(
+        f"org_goals_{user_id}",
+        lambda after: db.get_subtree_goals_page(user_id, after=after),
+        ['goal_id', 'employee_id', 'approved_count']
+    ):
+        st.info("No goals found in your organization.")
+
+    st.subheader("Organization Feedback")
+    if not paged_table(
+        f"org_feedback_{user_id}",
+        lambda after: db.get_subtree_feedback_page(user_id, after=after),
+        ['feedback_id']
+    ):
+        st.info("No feedback found in your organization.")
+
+sections = {"📋 Goals & Progress": lambda: goals_section(user_id, user_role)}
+if user_role == 'Manager':
+    sections["🎯 Set a New Goal"] = lambda: new_goal_section(user_id)
+sections["🔍 Search"] = lambda: search_section(user_id, user_role)
+sections["📜 Performance History"] = lambda: history_section(user_id, user_role)
+sections["🏢 My Organization"] = lambda: organization_section(user_id)
+
+# A section that disappears for the selected user (e.g. Set a New Goal) falls back to the first
+if st.session_state.get('section') not in sections:
+    st.session_state['section'] = next(iter(sections))
+section = st.radio("Section", list(sections), horizontal=True, key="section", label_visibility="collapsed")
+st.header(section)
+st.markdown("---")
+sections[section]()
+
+# ==============================================================================
+# Query Timings (debug)
+# ==============================================================================
+if st.sidebar.checkbox("Show query timings", key="show_query_timings"):
+    with st.sidebar.expander("Queries this rerun", expanded=True):
+        if query_trace:
+            trace_df = pd.DataFrame(query_trace)
+            st.caption(f"{len(trace_df)} events, {trace_df['execute_ms'].sum():.1f} ms in the database")
+            st.dataframe(trace_df, use_container_width=True)
+        else:
+            st.caption("No queries ran; every read was served from the cache.")
+        st.caption("Covers the last full-page run; fragment reruns are not included.")
@@ -0,0 +1,252 @@
+"""
+Query timing instrumentation for the backend.
+
+`InstrumentedCursor` (installed as the connection cursor_factory) times every
+execute and records the calling backend function, a normalized SQL
+fingerprint, the row count and the execute time into latency histograms.
+Connection checkout time is recorded by backend.db_connection. Queries slower
+than the configured threshold are written to the "epms.slow_query" logger,
+and all metrics can be rendered in Prometheus text format or served over HTTP.
+A per-thread trace collects the queries of one Streamlit rerun for display.
+"""
+import contextvars
+import functools
+import hashlib
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg2.extensions
+
+slow_query_logger = logging.getLogger("epms.slow_query")
+
+# Latency histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_slow_query_seconds = 0.25
+
+_current_function = contextvars.ContextVar("epms_backend_function", default="unknown")
+_current_trace = contextvars.ContextVar("epms_query_trace", default=None)
+
+
+def configure(slow_query_ms: Optional[float] = None):
+    """Sets the slow-query log threshold in milliseconds (None keeps the current value)."""
+    global _slow_query_seconds
+    if slow_query_ms is not None:
+        _slow_query_seconds = slow_query_ms / 1000.0
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus model."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled histograms and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._help: Dict[str, str] = {}
+        self.fingerprints: Dict[str, str] = {}  # query id -> fingerprint
+
+    def observe(self, name: str, help_text: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, help_text: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """Renders every metric (plus optional {name: (help, value)} gauges) as Prometheus text."""
+        lines = []
+
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ') for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        with self._lock:
+            for name in sorted({n for n, _ in self._histograms}):
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), h in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(h.buckets, h.counts):
+                        lines.append(f"{name}_bucket{label_text(labels, [('le', repr(bound))])} {count}")
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {h.count}")
+                    lines.append(f"{name}_sum{label_text(labels)} {h.sum}")
+                    lines.append(f"{name}_count{label_text(labels)} {h.count}")
+            for name in sorted({n for n, _ in self._counters}):
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{label_text(labels)} {value}")
+            if self.fingerprints:
+                lines.append("# HELP epms_query_info Normalized SQL for each query id.")
+                lines.append("# TYPE epms_query_info gauge")
+                for query_id, text in sorted(self.fingerprints.items()):
+                    lines.append(f"epms_query_info{label_text([('query', query_id), ('sql', text[:200])])} 1")
+
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> Tuple[str, str]:
+    """Normalizes SQL (comments, literals, placeholders, whitespace) and returns (query_id, text)."""
+    text = re.sub(r"--[^\n]*", " ", sql)
+    text = re.sub(r"'(?:[^']|'')*'", "?", text)
+    text = re.sub(r"%\(\w+\)s|%s|\$\d+", "?", text)
+    text = re.sub(r"\b\d+(\.\d+)?\b", "?", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:10], text
+
+
+def _sql_text(sql) -> str:
+    if isinstance(sql, bytes):
+        return sql.decode("utf-8", "replace")
+    return str(sql)
+
+
+def record_query(function: str, sql, rows: int, seconds: float, error: bool = False):
+    """Records one executed statement in the histograms, slow-query log and active trace."""
+    query_id, text = fingerprint(_sql_text(sql))
+    registry.fingerprints.setdefault(query_id, text)
+    registry.observe("epms_query_duration_seconds", "Statement execute time by backend function and query.",
+                     seconds, function=function, query=query_id)
+    if rows and rows > 0:
+        registry.increment("epms_query_rows_total", "Rows returned or affected.", rows,
+                           function=function, query=query_id)
+    if error:
+        registry.increment("epms_query_errors_total", "Statements that raised an error.",
+                           function=function, query=query_id)
+    if seconds >= _slow_query_seconds:
+        slow_query_logger.warning("slow query %.1f ms in %s (rows=%s) [%s]: %s",
+                                  seconds * 1000, function, rows, query_id, text[:500])
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append({
+            'function': function,
+            'query': text[:120],
+            'rows': rows,
+            'execute_ms': round(seconds * 1000, 2),
+            'error': error,
+        })
+
+
+def record_connect(seconds: float, function: Optional[str] = None):
+    """Records the time the current (or given) backend function waited to check out a connection."""
+    function = function or _current_function.get()
+    registry.observe("epms_connect_duration_seconds", "Connection checkout time by backend function.",
+                     seconds, function=function)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append({'function': function, 'query': '(connection checkout)', 'rows': None,
+                      'execute_ms': round(seconds * 1000, 2), 'error': False})
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor that times execute/executemany/copy_expert. `label` overrides the function name."""
+
+    label = None
+
+    def _timed(self, method, sql, *args, **kwargs):
+        started = time.perf_counter()
+        error = False
+        try:
+            return method(sql, *args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            record_query(self.label or _current_function.get(), sql, self.rowcount,
+                         time.perf_counter() - started, error)
+
+    def execute(self, sql, params=None):
+        return self._timed(super().execute, sql, params)
+
+    def executemany(self, sql, params_seq):
+        return self._timed(super().executemany, sql, params_seq)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(super().copy_expert, sql, file, size)
+
+
+def instrumented(func: Callable) -> Callable:
+    """Attributes queries inside `func` to its name and records its total call time."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_function.set(func.__name__)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            registry.observe("epms_backend_call_duration_seconds",
+                             "Backend function call time, including cache hits.",
+                             time.perf_counter() - started, function=func.__name__)
+            _current_function.reset(token)
+    return wrapper
+
+
+def start_trace() -> List[Dict[str, Any]]:
+    """Starts collecting query events for the current thread (e.g. one Streamlit rerun)."""
+    trace = []
+    _current_trace.set(trace)
+    return trace
+
+
+def start_metrics_server(port: int, render: Callable[[], str], host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serves `render()` as Prometheus text on http://host:port/metrics from a daemon thread."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,130 @@
+"""
+Versioned schema migrations for the PMS database.
+
+Migrations are plain SQL files in the `migrations/` directory named
+`NNNN_description.sql`. Each one runs exactly once, in version order, inside
+its own transaction, and is recorded in the `schema_version` table.
+
+Usage:
+    python migrate.py                 # apply pending migrations
+    python migrate.py --sample-data   # ... and insert sample data into an empty database
+    python migrate.py status          # list applied and pending migrations
+"""
+import argparse
+import os
+import re
+import sys
+from typing import List, Tuple
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Key for pg_advisory_lock so concurrently starting processes migrate one at a time
+MIGRATION_LOCK_ID = 30079
+
+_MIGRATION_FILE = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Tuple[int, str, str]]:
+    """Returns (version, name, path) for every migration file, sorted by version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}.")
+    return migrations
+
+
+def _ensure_version_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+    conn.commit()
+
+
+def applied_versions(conn) -> List[int]:
+    """Returns the versions already recorded in schema_version."""
+    _ensure_version_table(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM schema_version ORDER BY version;")
+        versions = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return versions
+
+
+def apply_migrations(conn, directory: str = MIGRATIONS_DIR) -> List[int]:
+    """
+    Applies every pending migration on `conn` and returns the versions applied.
+    Holds an advisory lock so only one process migrates at a time.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+    try:
+        done = set(applied_versions(conn))
+        applied = []
+        for version, name, path in discover_migrations(directory):
+            if version in done:
+                continue
+            with open(path, encoding="utf-8") as f:
+                sql = f.read()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql)
+                    cur.execute(
+                        "INSERT INTO schema_version (version, name) VALUES (%s, %s);",
+                        (version, name)
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+            print(f"Applied migration {version:04d}_{name}.")
+        return applied
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+        conn.commit()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply PMS database schema migrations.")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    parser.add_argument("--sample-data", action="store_true",
+                        help="insert the demo users and goals if the users table is empty")
+    args = parser.parse_args(argv)
+
+    import backend as db
+
+    with db.db_connection() as conn:
+        if args.command == "status":
+            done = set(applied_versions(conn))
+            for version, name, _ in discover_migrations():
+                state = "applied" if version in done else "pending"
+                print(f"{version:04d}_{name}: {state}")
+            return 0
+
+        applied = apply_migrations(conn)
+        if not applied:
+            print("Database schema is up to date.")
+        # As in backend.init_database: without upcoming quarters, new feedback
+        # lands in feedback_default until the app first starts.
+        created = db.ensure_feedback_partitions(conn)
+        if created:
+            print(f"Created {created} feedback partition(s).")
+        if args.sample_data:
+            db.insert_sample_data(conn)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+-- Indexes matched to the role-filtered access paths in backend.py.
+-- On a large existing database, build these beforehand with
+-- CREATE INDEX CONCURRENTLY using the same names; IF NOT EXISTS then skips them.
+
+-- get_goals / get_dashboard_metrics: WHERE manager_id = ? [AND status = ?]
+CREATE INDEX IF NOT EXISTS goals_manager_status_idx ON goals (manager_id, status);
+
+-- get_goals / get_dashboard_metrics: WHERE employee_id = ? [AND status = ?]
+CREATE INDEX IF NOT EXISTS goals_employee_status_idx ON goals (employee_id, status);
+
+-- get_performance_history goals: WHERE employee_id = ? ORDER BY due_date DESC
+CREATE INDEX IF NOT EXISTS goals_employee_due_date_idx ON goals (employee_id, due_date DESC);
+
+-- get_tasks_for_goal: WHERE goal_id = ? ORDER BY task_id (also serves ON DELETE CASCADE)
+CREATE INDEX IF NOT EXISTS tasks_goal_task_idx ON tasks (goal_id, task_id);
+
+-- get_performance_history feedback: WHERE employee_id = ? ORDER BY feedback_date DESC
+CREATE INDEX IF NOT EXISTS feedback_employee_date_idx ON feedback (employee_id, feedback_date DESC);
+
+-- Join from feedback to goals and ON DELETE CASCADE from goals
+CREATE INDEX IF NOT EXISTS feedback_goal_idx ON feedback (goal_id);
+
+-- get_employees: WHERE role = 'Employee' ORDER BY name
+CREATE INDEX IF NOT EXISTS users_role_name_idx ON users (role, name);
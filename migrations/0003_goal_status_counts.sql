@@ -0,0 +1,108 @@
+-- Per-user goal counts by status, kept current by statement-level triggers on goals,
+-- so dashboard totals are a primary-key lookup instead of a scan of the user's goals.
+-- scope is the role the user plays on the goal: 'Manager' (manager_id) or 'Employee' (employee_id).
+CREATE TABLE IF NOT EXISTS goal_status_counts (
+    user_id INTEGER NOT NULL,
+    scope VARCHAR(20) NOT NULL CHECK (scope IN ('Manager', 'Employee')),
+    status VARCHAR(20) NOT NULL,
+    goal_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, scope, status)
+);
+
+CREATE OR REPLACE FUNCTION goal_status_counts_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO goal_status_counts AS c (user_id, scope, status, goal_count)
+    SELECT user_id, scope, status, SUM(delta)
+    FROM (
+        SELECT manager_id AS user_id, 'Manager' AS scope, status, 1 AS delta FROM new_goals WHERE manager_id IS NOT NULL
+        UNION ALL
+        SELECT employee_id, 'Employee', status, 1 FROM new_goals WHERE employee_id IS NOT NULL
+    ) d
+    GROUP BY user_id, scope, status
+    ORDER BY user_id, scope, status
+    ON CONFLICT (user_id, scope, status) DO UPDATE SET goal_count = c.goal_count + EXCLUDED.goal_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION goal_status_counts_on_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO goal_status_counts AS c (user_id, scope, status, goal_count)
+    SELECT user_id, scope, status, SUM(delta)
+    FROM (
+        WITH changed AS (
+            SELECT o.manager_id AS old_manager_id, o.employee_id AS old_employee_id, o.status AS old_status,
+                   n.manager_id AS new_manager_id, n.employee_id AS new_employee_id, n.status AS new_status
+            FROM old_goals o
+            JOIN new_goals n ON n.goal_id = o.goal_id
+            WHERE (o.status, o.manager_id, o.employee_id) IS DISTINCT FROM (n.status, n.manager_id, n.employee_id)
+        )
+        SELECT old_manager_id AS user_id, 'Manager' AS scope, old_status AS status, -1 AS delta FROM changed WHERE old_manager_id IS NOT NULL
+        UNION ALL
+        SELECT old_employee_id, 'Employee', old_status, -1 FROM changed WHERE old_employee_id IS NOT NULL
+        UNION ALL
+        SELECT new_manager_id, 'Manager', new_status, 1 FROM changed WHERE new_manager_id IS NOT NULL
+        UNION ALL
+        SELECT new_employee_id, 'Employee', new_status, 1 FROM changed WHERE new_employee_id IS NOT NULL
+    ) d
+    GROUP BY user_id, scope, status
+    HAVING SUM(delta) <> 0
+    ORDER BY user_id, scope, status
+    ON CONFLICT (user_id, scope, status) DO UPDATE SET goal_count = c.goal_count + EXCLUDED.goal_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION goal_status_counts_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO goal_status_counts AS c (user_id, scope, status, goal_count)
+    SELECT user_id, scope, status, SUM(delta)
+    FROM (
+        SELECT manager_id AS user_id, 'Manager' AS scope, status, -1 AS delta FROM old_goals WHERE manager_id IS NOT NULL
+        UNION ALL
+        SELECT employee_id, 'Employee', status, -1 FROM old_goals WHERE employee_id IS NOT NULL
+    ) d
+    GROUP BY user_id, scope, status
+    ORDER BY user_id, scope, status
+    ON CONFLICT (user_id, scope, status) DO UPDATE SET goal_count = c.goal_count + EXCLUDED.goal_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS goal_status_counts_insert ON goals;
+CREATE TRIGGER goal_status_counts_insert
+AFTER INSERT ON goals
+REFERENCING NEW TABLE AS new_goals
+FOR EACH STATEMENT
+EXECUTE FUNCTION goal_status_counts_on_insert();
+
+DROP TRIGGER IF EXISTS goal_status_counts_update ON goals;
+CREATE TRIGGER goal_status_counts_update
+AFTER UPDATE ON goals
+REFERENCING OLD TABLE AS old_goals NEW TABLE AS new_goals
+FOR EACH STATEMENT
+EXECUTE FUNCTION goal_status_counts_on_update();
+
+DROP TRIGGER IF EXISTS goal_status_counts_delete ON goals;
+CREATE TRIGGER goal_status_counts_delete
+AFTER DELETE ON goals
+REFERENCING OLD TABLE AS old_goals
+FOR EACH STATEMENT
+EXECUTE FUNCTION goal_status_counts_on_delete();
+
+-- Backfill from existing goals while writers are blocked
+LOCK TABLE goals IN SHARE ROW EXCLUSIVE MODE;
+DELETE FROM goal_status_counts;
+INSERT INTO goal_status_counts (user_id, scope, status, goal_count)
+SELECT manager_id, 'Manager', status, COUNT(*) FROM goals WHERE manager_id IS NOT NULL GROUP BY manager_id, status
+UNION ALL
+SELECT employee_id, 'Employee', status, COUNT(*) FROM goals WHERE employee_id IS NOT NULL GROUP BY employee_id, status;
+
+-- Open goals by due date, for the live overdue / due-this-week counts
+CREATE INDEX IF NOT EXISTS goals_manager_open_due_idx ON goals (manager_id, due_date)
+    WHERE status IN ('Draft', 'In Progress');
+CREATE INDEX IF NOT EXISTS goals_employee_open_due_idx ON goals (employee_id, due_date)
+    WHERE status IN ('Draft', 'In Progress');
@@ -0,0 +1,11 @@
+-- Indexes for keyset pagination in get_goals_page / get_feedback_page.
+-- NULL dates sort through COALESCE to +/-infinity so the keys are total orders.
+
+CREATE INDEX IF NOT EXISTS goals_manager_due_keyset_idx
+    ON goals (manager_id, (COALESCE(due_date, 'infinity'::date)), goal_id);
+
+CREATE INDEX IF NOT EXISTS goals_employee_due_keyset_idx
+    ON goals (employee_id, (COALESCE(due_date, 'infinity'::date)), goal_id);
+
+CREATE INDEX IF NOT EXISTS feedback_employee_date_keyset_idx
+    ON feedback (employee_id, (COALESCE(feedback_date, '-infinity'::timestamptz)) DESC, feedback_id DESC);
@@ -0,0 +1,28 @@
+-- Replace the row-level completion trigger with a statement-level one.
+-- Transition tables expose every updated row at once, so automated feedback for
+-- a batch status change is a single set-based INSERT, and the goal title comes
+-- straight from the new row instead of a lookup per goal.
+CREATE OR REPLACE FUNCTION log_automated_feedback()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO feedback (goal_id, manager_id, employee_id, feedback_text)
+    SELECT
+        n.goal_id,
+        n.manager_id,
+        n.employee_id,
+        'Automated feedback: Goal "' || n.title || '" has been marked as Completed. Great job!'
+    FROM new_goals n
+    JOIN old_goals o ON o.goal_id = n.goal_id
+    WHERE n.status = 'Completed' AND o.status != 'Completed';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables cannot be combined with a column list, so the trigger fires
+-- for every UPDATE statement on goals; the join above finds nothing unless a status changed.
+DROP TRIGGER IF EXISTS goal_status_change ON goals;
+CREATE TRIGGER goal_status_change
+AFTER UPDATE ON goals
+REFERENCING OLD TABLE AS old_goals NEW TABLE AS new_goals
+FOR EACH STATEMENT
+EXECUTE FUNCTION log_automated_feedback();
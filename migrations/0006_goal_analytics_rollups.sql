@@ -0,0 +1,94 @@
+-- Change tracking and rollup tables for analytics.py.
+
+-- updated_at drives the incremental refresh watermark; completed_at enables on-time rates.
+-- Only columns that affect the rollups bump updated_at.
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+
+CREATE OR REPLACE FUNCTION goals_track_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Inserted goals keep the completed_at the caller supplied: a seeded or imported
+    -- historical completion has no known date and is left out of on-time rates.
+    IF TG_OP = 'UPDATE' AND NEW.status IS DISTINCT FROM OLD.status THEN
+        NEW.completed_at := CASE WHEN NEW.status = 'Completed' THEN CURRENT_TIMESTAMP END;
+    END IF;
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS goals_track_changes ON goals;
+CREATE TRIGGER goals_track_changes
+BEFORE INSERT OR UPDATE OF status, due_date, manager_id, employee_id ON goals
+FOR EACH ROW
+EXECUTE FUNCTION goals_track_changes();
+
+CREATE INDEX IF NOT EXISTS goals_updated_at_idx ON goals (updated_at);
+
+-- Owners whose rollups a change invalidated but that updated_at cannot reveal:
+-- deleted goals and the previous manager/employee of reassigned goals.
+CREATE TABLE IF NOT EXISTS goal_analytics_changes (
+    manager_id INTEGER,
+    employee_id INTEGER,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS goal_analytics_changes_changed_at_idx ON goal_analytics_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION goal_analytics_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO goal_analytics_changes (manager_id, employee_id)
+    SELECT DISTINCT manager_id, employee_id FROM old_goals;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION goal_analytics_on_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO goal_analytics_changes (manager_id, employee_id)
+    SELECT DISTINCT o.manager_id, o.employee_id
+    FROM old_goals o
+    JOIN new_goals n ON n.goal_id = o.goal_id
+    WHERE (o.manager_id, o.employee_id) IS DISTINCT FROM (n.manager_id, n.employee_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS goal_analytics_delete ON goals;
+CREATE TRIGGER goal_analytics_delete
+AFTER DELETE ON goals
+REFERENCING OLD TABLE AS old_goals
+FOR EACH STATEMENT
+EXECUTE FUNCTION goal_analytics_on_delete();
+
+DROP TRIGGER IF EXISTS goal_analytics_update ON goals;
+CREATE TRIGGER goal_analytics_update
+AFTER UPDATE ON goals
+REFERENCING OLD TABLE AS old_goals NEW TABLE AS new_goals
+FOR EACH STATEMENT
+EXECUTE FUNCTION goal_analytics_on_update();
+
+-- Precomputed per-quarter metrics by due date. scope 'Manager' rows are the
+-- manager's team (goals they assigned); 'Employee' rows are individual goals.
+CREATE TABLE IF NOT EXISTS goal_rollups (
+    scope VARCHAR(20) NOT NULL CHECK (scope IN ('Manager', 'Employee')),
+    user_id INTEGER NOT NULL,
+    quarter DATE NOT NULL,
+    total_goals INTEGER NOT NULL,
+    completed_goals INTEGER NOT NULL,
+    completed_on_time INTEGER NOT NULL,
+    completed_with_date INTEGER NOT NULL,
+    cancelled_goals INTEGER NOT NULL,
+    completion_rate DOUBLE PRECISION,
+    on_time_rate DOUBLE PRECISION,
+    cancellation_rate DOUBLE PRECISION,
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (scope, user_id, quarter)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    watermark TIMESTAMP WITH TIME ZONE NOT NULL
+);
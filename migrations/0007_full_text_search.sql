@@ -0,0 +1,23 @@
+-- Full-text search over goals, tasks and feedback (backend.search).
+-- The tsvectors are stored generated columns, so every write path (including
+-- COPY in seed.py and bulk_import.py) keeps them current without triggers.
+-- Goal titles are weighted above descriptions when ranking.
+
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(description, '')), 'B')
+    ) STORED;
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', COALESCE(description, ''))) STORED;
+
+ALTER TABLE feedback ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', COALESCE(feedback_text, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS goals_search_idx ON goals USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS tasks_search_idx ON tasks USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS feedback_search_idx ON feedback USING GIN (search_vector);
+
+-- Role scoping for feedback matches: WHERE manager_id = ? (employee_id is covered by 0002)
+CREATE INDEX IF NOT EXISTS feedback_manager_idx ON feedback (manager_id);
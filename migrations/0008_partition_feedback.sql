@@ -0,0 +1,105 @@
+-- Range-partition feedback by feedback_date, one partition per UTC quarter
+-- (feedback_YYYY_qN). Rows outside every quarter land in feedback_default.
+-- backend.init_database and `python partitions.py ensure` create partitions
+-- ahead of time; `python partitions.py archive` detaches old quarters to
+-- compressed files and drops them.
+--
+-- The primary key must include the partition key, and feedback_date becomes
+-- NOT NULL so every row has a partition and listings can order by it directly.
+
+ALTER TABLE feedback RENAME TO feedback_legacy;
+
+CREATE TABLE feedback (
+    feedback_id INTEGER NOT NULL DEFAULT nextval('feedback_feedback_id_seq'),
+    goal_id INTEGER REFERENCES goals(goal_id) ON DELETE CASCADE,
+    manager_id INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
+    employee_id INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
+    feedback_text TEXT NOT NULL,
+    feedback_date TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', COALESCE(feedback_text, ''))) STORED
+) PARTITION BY RANGE (feedback_date);
+
+CREATE TABLE feedback_default PARTITION OF feedback DEFAULT;
+
+CREATE OR REPLACE FUNCTION feedback_partition_name(quarter_start DATE)
+RETURNS TEXT AS $$
+    SELECT format('feedback_%s_q%s', EXTRACT(YEAR FROM quarter_start)::int, EXTRACT(QUARTER FROM quarter_start)::int);
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Creates the missing quarter partitions covering [from_date, to_date] (UTC dates)
+-- and returns how many were created. Rows already in feedback_default for a new
+-- quarter are moved into it.
+CREATE OR REPLACE FUNCTION ensure_feedback_partitions(from_date DATE, to_date DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    quarter_start DATE := date_trunc('quarter', from_date)::date;
+    quarter_end DATE;
+    lower_bound TIMESTAMPTZ;
+    upper_bound TIMESTAMPTZ;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    -- Serialize concurrent callers (e.g. several app processes starting at once)
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_feedback_partitions'));
+
+    WHILE quarter_start <= to_date LOOP
+        quarter_end := (quarter_start + INTERVAL '3 months')::date;
+        partition_name := feedback_partition_name(quarter_start);
+        IF to_regclass(partition_name) IS NULL THEN
+            lower_bound := quarter_start::timestamp AT TIME ZONE 'UTC';
+            upper_bound := quarter_end::timestamp AT TIME ZONE 'UTC';
+
+            EXECUTE format(
+                'CREATE TEMP TABLE feedback_moving ON COMMIT DROP AS
+                 SELECT feedback_id, goal_id, manager_id, employee_id, feedback_text, feedback_date
+                 FROM feedback_default
+                 WHERE feedback_date >= %L AND feedback_date < %L',
+                lower_bound, upper_bound
+            );
+            DELETE FROM feedback_default
+            WHERE feedback_date >= lower_bound AND feedback_date < upper_bound;
+
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF feedback FOR VALUES FROM (%L) TO (%L)',
+                partition_name, lower_bound, upper_bound
+            );
+
+            INSERT INTO feedback (feedback_id, goal_id, manager_id, employee_id, feedback_text, feedback_date)
+            SELECT feedback_id, goal_id, manager_id, employee_id, feedback_text, feedback_date
+            FROM feedback_moving;
+            DROP TABLE feedback_moving;
+
+            created := created + 1;
+        END IF;
+        quarter_start := quarter_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_feedback_partitions(
+    COALESCE((SELECT MIN(feedback_date) AT TIME ZONE 'UTC' FROM feedback_legacy)::date, CURRENT_DATE),
+    ((CURRENT_TIMESTAMP AT TIME ZONE 'UTC') + INTERVAL '1 year')::date
+);
+
+INSERT INTO feedback (feedback_id, goal_id, manager_id, employee_id, feedback_text, feedback_date)
+SELECT feedback_id, goal_id, manager_id, employee_id, feedback_text, COALESCE(feedback_date, CURRENT_TIMESTAMP)
+FROM feedback_legacy;
+
+ALTER SEQUENCE feedback_feedback_id_seq OWNED BY feedback.feedback_id;
+DROP TABLE feedback_legacy;
+
+-- Indexes are declared on the parent and created on every current and future partition.
+ALTER TABLE feedback ADD PRIMARY KEY (feedback_id, feedback_date);
+
+-- get_performance_history / get_feedback_page / page bundle:
+-- WHERE employee_id = ? ORDER BY feedback_date DESC, feedback_id DESC
+CREATE INDEX IF NOT EXISTS feedback_employee_date_keyset_idx
+    ON feedback (employee_id, feedback_date DESC, feedback_id DESC);
+
+CREATE INDEX IF NOT EXISTS feedback_goal_idx ON feedback (goal_id);
+CREATE INDEX IF NOT EXISTS feedback_manager_idx ON feedback (manager_id);
+CREATE INDEX IF NOT EXISTS feedback_search_idx ON feedback USING GIN (search_vector);
+
+ANALYZE feedback;
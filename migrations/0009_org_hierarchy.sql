@@ -0,0 +1,135 @@
+-- Reporting lines and a closure table of the org tree, for skip-level rollups.
+-- users.manager_id is each user's direct manager; user_hierarchy holds one row per
+-- (ancestor, descendant) pair, including depth 0 for every user itself, so a whole
+-- subtree is an index range scan instead of a recursive query.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS manager_id INTEGER REFERENCES users(user_id) ON DELETE SET NULL;
+ALTER TABLE users ADD CONSTRAINT users_not_own_manager CHECK (manager_id <> user_id);
+CREATE INDEX IF NOT EXISTS users_manager_idx ON users (manager_id);
+
+-- Existing employees report to the manager who assigned them the most goals
+UPDATE users u
+SET manager_id = (
+    SELECT g.manager_id
+    FROM goals g
+    WHERE g.employee_id = u.user_id AND g.manager_id IS NOT NULL AND g.manager_id <> u.user_id
+    GROUP BY g.manager_id
+    ORDER BY COUNT(*) DESC, g.manager_id
+    LIMIT 1
+)
+WHERE u.role = 'Employee' AND u.manager_id IS NULL;
+
+CREATE TABLE IF NOT EXISTS user_hierarchy (
+    ancestor_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    descendant_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+-- Ancestors of a user (cycle checks, ancestor lookups)
+CREATE INDEX IF NOT EXISTS user_hierarchy_descendant_idx ON user_hierarchy (descendant_id, ancestor_id);
+
+-- Closure maintenance takes this transaction-level advisory lock, so concurrent moves
+-- (A under B while B moves under A) run one after the other and each cycle check sees
+-- the closure rows committed by the other. Statements in plpgsql take a new snapshot,
+-- so reads after the lock is granted include the earlier transaction's changes.
+
+-- New users: walk each one's manager chain. Users inserted together (e.g. a COPY of
+-- a whole org) are covered because the chain is read from users, not the closure.
+CREATE OR REPLACE FUNCTION user_hierarchy_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('user_hierarchy'));
+    INSERT INTO user_hierarchy (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE chain AS (
+        SELECT user_id AS descendant_id, user_id AS ancestor_id, 0 AS depth FROM new_users
+        UNION ALL
+        SELECT c.descendant_id, u.manager_id, c.depth + 1
+        FROM chain c
+        JOIN users u ON u.user_id = c.ancestor_id
+        WHERE u.manager_id IS NOT NULL AND c.depth < 1000
+    )
+    SELECT ancestor_id, descendant_id, depth FROM chain;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Manager changes: move each user's subtree under the new manager, one user at a time
+-- so several moves in one statement compose. Transition tables cannot be combined with
+-- UPDATE OF manager_id, so other column updates fire this too and find no moved rows.
+CREATE OR REPLACE FUNCTION user_hierarchy_on_update()
+RETURNS TRIGGER AS $$
+DECLARE
+    moved RECORD;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM old_users o JOIN new_users n ON n.user_id = o.user_id
+        WHERE n.manager_id IS DISTINCT FROM o.manager_id
+    ) THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext('user_hierarchy'));
+
+    FOR moved IN
+        SELECT n.user_id, n.manager_id
+        FROM old_users o
+        JOIN new_users n ON n.user_id = o.user_id
+        WHERE n.manager_id IS DISTINCT FROM o.manager_id
+        ORDER BY n.user_id
+    LOOP
+        IF moved.manager_id IS NOT NULL AND EXISTS (
+            SELECT 1 FROM user_hierarchy WHERE ancestor_id = moved.user_id AND descendant_id = moved.manager_id
+        ) THEN
+            RAISE EXCEPTION 'User % cannot report to user %, who is in their own reporting line', moved.user_id, moved.manager_id;
+        END IF;
+
+        -- Detach: paths from the user's former ancestors into the user's subtree
+        DELETE FROM user_hierarchy h
+        USING user_hierarchy up, user_hierarchy down
+        WHERE up.descendant_id = moved.user_id AND up.depth > 0
+          AND down.ancestor_id = moved.user_id
+          AND h.ancestor_id = up.ancestor_id
+          AND h.descendant_id = down.descendant_id;
+
+        -- Attach: every ancestor of the new manager (and the manager) to every node of the subtree
+        INSERT INTO user_hierarchy (ancestor_id, descendant_id, depth)
+        SELECT up.ancestor_id, down.descendant_id, up.depth + down.depth + 1
+        FROM user_hierarchy up
+        JOIN user_hierarchy down ON down.ancestor_id = moved.user_id
+        WHERE up.descendant_id = moved.manager_id;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill from the reporting lines while writers are blocked
+LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE;
+DELETE FROM user_hierarchy;
+INSERT INTO user_hierarchy (ancestor_id, descendant_id, depth)
+WITH RECURSIVE chain AS (
+    SELECT user_id AS descendant_id, user_id AS ancestor_id, 0 AS depth FROM users
+    UNION ALL
+    SELECT c.descendant_id, u.manager_id, c.depth + 1
+    FROM chain c
+    JOIN users u ON u.user_id = c.ancestor_id
+    WHERE u.manager_id IS NOT NULL AND c.depth < 1000
+)
+SELECT ancestor_id, descendant_id, depth FROM chain;
+
+DROP TRIGGER IF EXISTS user_hierarchy_insert ON users;
+CREATE TRIGGER user_hierarchy_insert
+AFTER INSERT ON users
+REFERENCING NEW TABLE AS new_users
+FOR EACH STATEMENT
+EXECUTE FUNCTION user_hierarchy_on_insert();
+
+DROP TRIGGER IF EXISTS user_hierarchy_update ON users;
+CREATE TRIGGER user_hierarchy_update
+AFTER UPDATE ON users
+REFERENCING OLD TABLE AS old_users NEW TABLE AS new_users
+FOR EACH STATEMENT
+EXECUTE FUNCTION user_hierarchy_on_update();
+
+-- Subtree feedback listing: newest first across many employees
+CREATE INDEX IF NOT EXISTS feedback_date_keyset_idx ON feedback (feedback_date DESC, feedback_id DESC);
+
+ANALYZE users, user_hierarchy;
@@ -0,0 +1,116 @@
+-- Per-goal task counters, kept current by statement-level triggers on tasks, so goal
+-- listings can show progress (approved_count / task_count) without joining tasks.
+-- A goal with no tasks has task_count = 0 and no progress.
+
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS task_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE goals ADD COLUMN IF NOT EXISTS approved_count INTEGER NOT NULL DEFAULT 0;
+
+-- Applies one statement's net change per goal. Goal rows are locked in goal_id order
+-- first so concurrent statements touching several goals cannot deadlock each other.
+-- NO KEY UPDATE still serializes counter updates but does not conflict with the
+-- KEY SHARE lock the tasks -> goals foreign-key check holds for concurrent inserts.
+-- Only the counter columns change, so goals_track_changes does not fire and the
+-- statement-level goal triggers find no status or assignment changes.
+CREATE OR REPLACE FUNCTION apply_goal_task_deltas(goal_ids INTEGER[], task_deltas BIGINT[], approved_deltas BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+    PERFORM 1 FROM goals WHERE goal_id = ANY(goal_ids) ORDER BY goal_id FOR NO KEY UPDATE;
+    UPDATE goals g
+    SET task_count = g.task_count + d.task_delta,
+        approved_count = g.approved_count + d.approved_delta
+    FROM unnest(goal_ids, task_deltas, approved_deltas) AS d(goal_id, task_delta, approved_delta)
+    WHERE g.goal_id = d.goal_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION goal_task_counts_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_goal_task_deltas(array_agg(goal_id), array_agg(task_delta), array_agg(approved_delta))
+    FROM (
+        SELECT goal_id, COUNT(*) AS task_delta, COUNT(*) FILTER (WHERE is_approved) AS approved_delta
+        FROM new_tasks
+        WHERE goal_id IS NOT NULL
+        GROUP BY goal_id
+    ) d;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Covers approvals (is_approved) and tasks moved between goals (goal_id)
+CREATE OR REPLACE FUNCTION goal_task_counts_on_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_goal_task_deltas(array_agg(goal_id), array_agg(task_delta), array_agg(approved_delta))
+    FROM (
+        SELECT goal_id, SUM(task_delta) AS task_delta, SUM(approved_delta) AS approved_delta
+        FROM (
+            SELECT o.goal_id, -1 AS task_delta, -(o.is_approved IS TRUE)::int AS approved_delta
+            FROM old_tasks o
+            JOIN new_tasks n ON n.task_id = o.task_id
+            WHERE (o.goal_id, o.is_approved) IS DISTINCT FROM (n.goal_id, n.is_approved)
+            UNION ALL
+            SELECT n.goal_id, 1, (n.is_approved IS TRUE)::int
+            FROM old_tasks o
+            JOIN new_tasks n ON n.task_id = o.task_id
+            WHERE (o.goal_id, o.is_approved) IS DISTINCT FROM (n.goal_id, n.is_approved)
+        ) changed
+        WHERE goal_id IS NOT NULL
+        GROUP BY goal_id
+        HAVING SUM(task_delta) <> 0 OR SUM(approved_delta) <> 0
+    ) d;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION goal_task_counts_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_goal_task_deltas(array_agg(goal_id), array_agg(task_delta), array_agg(approved_delta))
+    FROM (
+        SELECT goal_id, -COUNT(*) AS task_delta, -COUNT(*) FILTER (WHERE is_approved) AS approved_delta
+        FROM old_tasks
+        WHERE goal_id IS NOT NULL
+        GROUP BY goal_id
+    ) d;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS goal_task_counts_insert ON tasks;
+CREATE TRIGGER goal_task_counts_insert
+AFTER INSERT ON tasks
+REFERENCING NEW TABLE AS new_tasks
+FOR EACH STATEMENT
+EXECUTE FUNCTION goal_task_counts_on_insert();
+
+-- Transition tables cannot be combined with UPDATE OF is_approved, goal_id, so edits
+-- to other columns fire this too and find no changed rows.
+DROP TRIGGER IF EXISTS goal_task_counts_update ON tasks;
+CREATE TRIGGER goal_task_counts_update
+AFTER UPDATE ON tasks
+REFERENCING OLD TABLE AS old_tasks NEW TABLE AS new_tasks
+FOR EACH STATEMENT
+EXECUTE FUNCTION goal_task_counts_on_update();
+
+DROP TRIGGER IF EXISTS goal_task_counts_delete ON tasks;
+CREATE TRIGGER goal_task_counts_delete
+AFTER DELETE ON tasks
+REFERENCING OLD TABLE AS old_tasks
+FOR EACH STATEMENT
+EXECUTE FUNCTION goal_task_counts_on_delete();
+
+-- Backfill from existing tasks while task writers are blocked (new columns start at 0)
+LOCK TABLE tasks IN SHARE ROW EXCLUSIVE MODE;
+UPDATE goals g
+SET task_count = c.task_count,
+    approved_count = c.approved_count
+FROM (
+    SELECT goal_id, COUNT(*) AS task_count, COUNT(*) FILTER (WHERE is_approved) AS approved_count
+    FROM tasks
+    WHERE goal_id IS NOT NULL
+    GROUP BY goal_id
+) c
+WHERE c.goal_id = g.goal_id;
+
+ANALYZE goals;
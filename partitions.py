@@ -0,0 +1,174 @@
+"""
+Maintenance of the quarterly feedback partitions.
+
+`ensure` creates partitions ahead of the current quarter (backend.init_database
+does the same on startup). `archive` enforces retention: every quarter older
+than the retention window is detached from feedback, written to
+`<dest>/feedback_YYYY_qN.csv.gz`, checked against its row count and dropped,
+so history queries and vacuum only deal with recent partitions. `restore`
+loads an archive file back into its quarter.
+
+Usage:
+    python partitions.py ensure                      # e.g. from cron daily
+    python partitions.py archive archive/            # keep FEEDBACK_RETENTION_QUARTERS quarters
+    python partitions.py archive archive/ --keep-quarters 12 --dry-run
+    python partitions.py restore archive/feedback_2022_q1.csv.gz
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+from datetime import date
+from typing import List, Tuple
+
+from psycopg2 import sql
+
+import backend as db
+
+# Quarters of feedback kept online, counting the current one
+FEEDBACK_RETENTION_QUARTERS = 12
+
+# Columns written to and read from archive files (search_vector is generated)
+ARCHIVE_COLUMNS = ['feedback_id', 'goal_id', 'manager_id', 'employee_id', 'feedback_text', 'feedback_date']
+
+_PARTITION_NAME = re.compile(r"^feedback_(\d{4})_q([1-4])$")
+
+
+def quarter_start(name: str) -> date:
+    """Returns the first day of the quarter a feedback_YYYY_qN partition (or archive file) holds."""
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        raise ValueError(f"{name!r} is not a quarterly feedback partition name.")
+    return date(int(match.group(1)), (int(match.group(2)) - 1) * 3 + 1, 1)
+
+
+def _add_quarters(day: date, quarters: int) -> date:
+    months = day.year * 12 + (day.month - 1) + quarters * 3
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def list_partitions(cur) -> List[Tuple[str, bool]]:
+    """
+    Returns (name, attached) for every quarterly feedback table, oldest first,
+    including ones detached by an interrupted archive run.
+    """
+    cur.execute("""
+        SELECT c.relname, i.inhparent IS NOT NULL
+        FROM pg_class c
+        LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = 'feedback'::regclass
+        WHERE c.relkind = 'r'
+          AND c.relnamespace = current_schema()::regnamespace
+          AND c.relname ~ '^feedback_[0-9]{4}_q[1-4]$'
+        ORDER BY c.relname;
+    """)
+    return cur.fetchall()
+
+
+def archive_partition(conn, name: str, attached: bool, dest: str) -> int:
+    """
+    Detaches one quarter, writes it to `<dest>/<name>.csv.gz` and drops it once the
+    file is complete. Returns the number of rows archived.
+    """
+    table = sql.Identifier(name)
+    path = os.path.join(dest, f"{name}.csv.gz")
+    with conn.cursor() as cur:
+        if attached:
+            cur.execute(sql.SQL("ALTER TABLE feedback DETACH PARTITION {};").format(table))
+            conn.commit()
+
+        cur.execute(sql.SQL("SELECT COUNT(*) FROM {};").format(table))
+        expected = cur.fetchone()[0]
+        partial = path + ".part"
+        with gzip.open(partial, "wt", encoding="utf-8", newline="") as f:
+            cur.copy_expert(
+                sql.SQL("COPY {} ({}) TO STDOUT WITH (FORMAT csv, HEADER)").format(
+                    table, sql.SQL(", ").join(map(sql.Identifier, ARCHIVE_COLUMNS))
+                ).as_string(conn),
+                f
+            )
+            written = cur.rowcount
+        if written >= 0 and written != expected:
+            raise RuntimeError(f"Archived {written} of {expected} rows from {name}; keeping the table.")
+        with open(partial, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+
+        cur.execute(sql.SQL("DROP TABLE {};").format(table))
+        db.invalidate_cache(cur, ["*"])
+        conn.commit()
+    return expected
+
+
+def archive(dest: str, keep_quarters: int = FEEDBACK_RETENTION_QUARTERS, dry_run: bool = False) -> List[Tuple[str, int]]:
+    """Archives every quarter older than the newest `keep_quarters`. Returns (partition, rows)."""
+    os.makedirs(dest, exist_ok=True)
+    today = date.today()
+    cutoff = _add_quarters(date(today.year, (today.month - 1) // 3 * 3 + 1, 1), -(keep_quarters - 1))
+    archived = []
+    with db.db_connection() as conn:
+        with conn.cursor() as cur:
+            partitions = list_partitions(cur)
+        conn.commit()
+        for name, attached in partitions:
+            if quarter_start(name) >= cutoff:
+                continue
+            if dry_run:
+                archived.append((name, 0))
+                continue
+            rows = archive_partition(conn, name, attached, dest)
+            archived.append((name, rows))
+            print(f"Archived {name}: {rows:,} rows.", file=sys.stderr)
+    return archived
+
+
+def restore(path: str) -> int:
+    """Loads an archive file back into its quarter's partition. Returns the rows loaded."""
+    name = os.path.basename(path).split(".")[0]
+    start = quarter_start(name)
+    with db.db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT ensure_feedback_partitions(%s, %s);", (start, start))
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            cur.copy_expert(
+                f"COPY feedback ({', '.join(ARCHIVE_COLUMNS)}) FROM STDIN WITH (FORMAT csv, HEADER)", f
+            )
+            rows = cur.rowcount
+        db.invalidate_cache(cur, ["*"])
+        conn.commit()
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Create, archive and restore quarterly feedback partitions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ensure_parser = subparsers.add_parser("ensure", help="create upcoming quarter partitions")
+    ensure_parser.add_argument("--quarters-ahead", type=int, default=db.FEEDBACK_PARTITIONS_AHEAD)
+
+    archive_parser = subparsers.add_parser("archive", help="detach, compress and drop old quarters")
+    archive_parser.add_argument("dest", help="directory for the .csv.gz files")
+    archive_parser.add_argument("--keep-quarters", type=int, default=FEEDBACK_RETENTION_QUARTERS)
+    archive_parser.add_argument("--dry-run", action="store_true", help="only list the quarters to archive")
+
+    restore_parser = subparsers.add_parser("restore", help="load an archived quarter back")
+    restore_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "ensure":
+        with db.db_connection() as conn:
+            created = db.ensure_feedback_partitions(conn, args.quarters_ahead)
+        print(f"Created {created} feedback partition(s).")
+    elif args.command == "archive":
+        if args.keep_quarters < 1:
+            parser.error("--keep-quarters must be at least 1")
+        archived = archive(args.dest, args.keep_quarters, args.dry_run)
+        verb = "Would archive" if args.dry_run else "Archived"
+        print(f"{verb} {len(archived)} partition(s): {', '.join(name for name, _ in archived) or 'none'}.")
+    else:
+        rows = restore(args.path)
+        print(f"Restored {rows:,} rows from {args.path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe, blocking PostgreSQL connection pool.
+
+    Unlike psycopg2's ThreadedConnectionPool, callers wait (up to a timeout)
+    for a connection when the pool is exhausted instead of failing at once.
+    Idle connections are health-checked on checkout and replaced if broken.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 10.0,
+        health_check_after: float = 30.0,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool size must satisfy 0 <= minconn <= maxconn and maxconn >= 1.")
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, returned_at)
+        self._in_use = set()
+        self._opening = 0
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'health_check_failures': 0,
+        }
+        self._waiting = 0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._stats['connections_created'] += 1
+
+    def _discard(self, conn):
+        self._stats['connections_discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Checks out a healthy connection, waiting up to `timeout` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.monotonic()
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("Connection pool is closed.")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._opening += 1
+                    break
+                if len(self._in_use) + len(self._idle) + self._opening < self.maxconn:
+                    conn = None
+                    self._opening += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"Timed out after {timeout:.1f}s waiting for a database connection "
+                        f"(pool size {self.maxconn})."
+                    )
+                if not waited:
+                    waited = True
+                    self._stats['waits'] += 1
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if waited:
+                wait_seconds = time.monotonic() - started
+                self._stats['wait_seconds_total'] += wait_seconds
+                self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], wait_seconds)
+
+        # The slot is reserved through `_opening`; connecting and health checks
+        # happen outside the lock so one slow handshake does not stall others.
+        try:
+            if conn is not None and not self._is_healthy(conn, time.monotonic() - returned_at):
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                    self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+                with self._cond:
+                    self._stats['connections_created'] += 1
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._opening -= 1
+            self._in_use.add(conn)
+            self._stats['checkouts'] += 1
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Returns a connection to the pool, resetting any open transaction."""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """
+        Context manager yielding a pooled connection.
+        The connection is rolled back on error and always returned to the pool.
+        """
+        conn = self.getconn(timeout)
+        broken = False
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of pool usage and wait-queue metrics."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'size': len(self._idle) + len(self._in_use),
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'minconn': self.minconn,
+                'maxconn': self.maxconn,
+            })
+        return snapshot
+
+    def closeall(self):
+        """Closes every idle connection and refuses further checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
@@ -0,0 +1,163 @@
+"""
+Local primary + streaming replica pair for exercising read routing.
+
+Creates two PostgreSQL clusters under a directory (initdb, then pg_basebackup
+with a standby configuration), starts them on local ports and prints the
+backend settings that route reads to the replica. `pause` / `resume` stop and
+restart WAL replay on the replica, so lag builds up and reads can be seen
+falling back to the primary once it exceeds REPLICA_MAX_LAG_SECONDS.
+
+Usage:
+    python replication.py start .pgdata                 # primary on 5433, replica on 5434
+    python replication.py status .pgdata
+    python replication.py pause .pgdata                 # simulate replication lag
+    python replication.py resume .pgdata
+    python replication.py stop .pgdata
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from contextlib import closing
+from typing import Optional
+
+import psycopg2
+
+import backend as db
+
+PRIMARY_PORT = 5433
+REPLICA_PORT = 5434
+
+
+def _tool(name: str, pg_bin: Optional[str]) -> str:
+    path = os.path.join(pg_bin, name) if pg_bin else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise RuntimeError(f"{name} not found; put the PostgreSQL bin directory on PATH or pass --pg-bin.")
+    return path
+
+
+def _append(path: str, lines):
+    with open(path, "a") as f:
+        f.write("\n" + "\n".join(lines) + "\n")
+
+
+def _pg_ctl(action: str, data_dir: str, pg_bin: Optional[str]):
+    args = [_tool("pg_ctl", pg_bin), "-D", data_dir, "-w", action]
+    if action == "start":
+        args[3:3] = ["-l", os.path.join(data_dir, "postgres.log")]
+    elif action == "stop":
+        args += ["-m", "fast"]
+    subprocess.run(args, check=action != "stop")
+
+
+def _connect(port: int, dbname: str = "postgres"):
+    conn = psycopg2.connect(host="localhost", port=port, user="postgres", dbname=dbname)
+    conn.autocommit = True
+    return conn
+
+
+def start(directory: str, primary_port: int, replica_port: int, pg_bin: Optional[str] = None):
+    """Initialises (first run only) and starts the primary and its streaming replica."""
+    primary_dir = os.path.join(directory, "primary")
+    replica_dir = os.path.join(directory, "replica")
+
+    if not os.path.exists(primary_dir):
+        subprocess.run([_tool("initdb", pg_bin), "-D", primary_dir, "-U", "postgres", "--auth=trust",
+                        "--encoding=UTF8"], check=True)
+        _append(os.path.join(primary_dir, "postgresql.conf"), [
+            f"port = {primary_port}",
+            "listen_addresses = 'localhost'",
+            "wal_level = replica",
+            "max_wal_senders = 5",
+            "hot_standby = on",
+        ])
+        _append(os.path.join(primary_dir, "pg_hba.conf"), [
+            "host replication postgres 127.0.0.1/32 trust",
+            "host replication postgres ::1/128 trust",
+        ])
+    _pg_ctl("start", primary_dir, pg_bin)
+
+    with closing(_connect(primary_port)) as conn, conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s;", (db.DB_NAME,))
+        if cur.fetchone() is None:
+            cur.execute(f'CREATE DATABASE "{db.DB_NAME}";')
+
+    if not os.path.exists(replica_dir):
+        # -R writes standby.signal and primary_conninfo; -X stream copies WAL during the backup
+        subprocess.run([_tool("pg_basebackup", pg_bin), "-h", "localhost", "-p", str(primary_port),
+                        "-U", "postgres", "-D", replica_dir, "-R", "-X", "stream"], check=True)
+        _append(os.path.join(replica_dir, "postgresql.auto.conf"), [f"port = {replica_port}"])
+    _pg_ctl("start", replica_dir, pg_bin)
+
+    print(f"Primary on localhost:{primary_port}, replica on localhost:{replica_port}.")
+    print("Set in backend.py (and use a blank DB_PASSWORD, authentication is trust):")
+    print(f"    DB_PORT = {primary_port}")
+    print(f"    DB_REPLICA_HOSTS = [('localhost', {replica_port})]")
+    print("Then run: python migrate.py --sample-data")
+
+
+def stop(directory: str, pg_bin: Optional[str] = None):
+    """Stops the replica, then the primary."""
+    for name in ("replica", "primary"):
+        data_dir = os.path.join(directory, name)
+        if os.path.exists(data_dir):
+            _pg_ctl("stop", data_dir, pg_bin)
+
+
+def status(primary_port: int, replica_port: int):
+    """Prints the primary's view of replication and the lag the backend would measure."""
+    with closing(_connect(primary_port)) as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT client_addr, state, sent_lsn, replay_lsn, replay_lag
+            FROM pg_stat_replication;
+        """)
+        rows = cur.fetchall()
+    if not rows:
+        print("No replicas are streaming from the primary.")
+    for client, state, sent, replayed, lag in rows:
+        print(f"replica {client}: {state}, sent {sent}, replayed {replayed}, replay lag {lag}")
+
+    with closing(_connect(replica_port)) as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_is_wal_replay_paused();")
+        paused = cur.fetchone()[0]
+    db.DB_REPLICA_HOSTS = [("localhost", replica_port)]
+    lag = db.measure_replica_lag(("localhost", replica_port))
+    serving = lag is not None and lag <= db.REPLICA_MAX_LAG_SECONDS
+    print(f"replica localhost:{replica_port}: replay {'paused' if paused else 'running'}, "
+          f"lag {lag if lag is not None else 'unknown'} s, "
+          f"{'serving reads' if serving else 'reads fall back to the primary'}")
+
+
+def set_replay(replica_port: int, paused: bool):
+    """Pauses or resumes WAL replay on the replica."""
+    with closing(_connect(replica_port)) as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_wal_replay_pause();" if paused else "SELECT pg_wal_replay_resume();")
+    print(f"WAL replay {'paused' if paused else 'resumed'} on localhost:{replica_port}.")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a local primary/replica pair for read routing.")
+    parser.add_argument("command", choices=["start", "stop", "status", "pause", "resume"])
+    parser.add_argument("directory", help="directory holding the primary/ and replica/ clusters")
+    parser.add_argument("--primary-port", type=int, default=PRIMARY_PORT)
+    parser.add_argument("--replica-port", type=int, default=REPLICA_PORT)
+    parser.add_argument("--pg-bin", help="directory containing initdb, pg_ctl and pg_basebackup")
+    args = parser.parse_args(argv)
+
+    if args.command == "start":
+        os.makedirs(args.directory, exist_ok=True)
+        start(args.directory, args.primary_port, args.replica_port, args.pg_bin)
+    elif args.command == "stop":
+        stop(args.directory, args.pg_bin)
+    else:
+        db.DB_HOST, db.DB_PORT, db.DB_USER, db.DB_PASSWORD = "localhost", args.primary_port, "postgres", ""
+        if args.command == "status":
+            status(args.primary_port, args.replica_port)
+        else:
+            set_replay(args.replica_port, paused=args.command == "pause")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Synthetic org-scale data generator for local performance testing.
+
+Loads users, goals, tasks and feedback through COPY in chunks so EXPLAIN plans
+and query latency can be checked against realistic volumes.
+
+Usage:
+    python seed.py                                   # 50k users, 2M goals, 10M tasks
+    python seed.py --users 1000 --goals 20000 --tasks 100000 --feedback 5000
+"""
+import argparse
+import io
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = np.array([
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+    'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Priya', 'Arjun',
+    'Wei', 'Mei', 'Carlos', 'Sofia', 'Ahmed', 'Fatima', 'Yuki', 'Kenji', 'Olga', 'Ivan',
+])
+LAST_NAMES = np.array([
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Sharma', 'Patel',
+    'Chen', 'Wang', 'Kim', 'Nguyen', 'Khan', 'Silva', 'Tanaka', 'Sato', 'Petrov', 'Novak',
+])
+GOAL_TITLES = np.array([
+    'Sales Target', 'Complete Certification', 'Customer Satisfaction', 'Reduce Ticket Backlog',
+    'Launch Project', 'Improve Code Coverage', 'Mentor New Hires', 'Cost Reduction',
+    'Process Automation', 'Quarterly Report', 'Security Training', 'Release Milestone',
+])
+GOAL_DESCRIPTIONS = np.array([
+    'Achieve agreed growth against the quarterly plan.',
+    'Finish the assigned certification course and exam.',
+    'Raise the satisfaction score for owned accounts.',
+    'Lead the initiative from kickoff to delivery.',
+    'Document and automate a recurring manual process.',
+    'Deliver the milestone on schedule with stakeholder sign-off.',
+])
+TASK_DESCRIPTIONS = np.array([
+    'Drafted plan and shared with manager.', 'Completed first milestone.', 'Met with stakeholders.',
+    'Submitted progress report.', 'Finished training module.', 'Reviewed results and next steps.',
+    'Resolved blocking issues.', 'Presented demo to the team.',
+])
+FEEDBACK_TEXTS = np.array([
+    'Great progress this quarter, keep it up.', 'Please share more frequent status updates.',
+    'Strong ownership of the deliverable.', 'Consider breaking the work into smaller milestones.',
+    'Excellent collaboration with the wider team.', 'Needs attention before the due date.',
+])
+QUARTERS = np.array(['Q1', 'Q2', 'Q3', 'Q4'])
+
+MANAGER_RATIO = 8  # roughly one manager per eight employees
+
+
+def _reserve_ids(cur, table: str, column: str, count: int) -> int:
+    """Reserves `count` consecutive serial values and returns the first one."""
+    cur.execute(
+        "SELECT setval(pg_get_serial_sequence(%s, %s), nextval(pg_get_serial_sequence(%s, %s)) + %s - 1);",
+        (table, column, table, column, count)
+    )
+    return cur.fetchone()[0] - count + 1
+
+
+def _copy(cur, table: str, df: pd.DataFrame):
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def _chunks(total: int, chunk_size: int):
+    start = 0
+    while start < total:
+        yield start, min(chunk_size, total - start)
+        start += chunk_size
+
+
+def _progress(label: str, done: int, total: int, started: float):
+    rate = done / max(time.monotonic() - started, 1e-9)
+    print(f"\r{label}: {done:,}/{total:,} ({rate:,.0f} rows/s)", end="", file=sys.stderr, flush=True)
+    if done >= total:
+        print(file=sys.stderr)
+
+
+def seed(conn, users: int, goals: int, tasks: int, feedback: int,
+         chunk_size: int = 100_000, seed_value: int = 42):
+    """Generates and loads a synthetic organisation on `conn`."""
+    rng = np.random.default_rng(seed_value)
+    today = date.today()
+    epoch = np.datetime64(today - timedelta(days=3 * 365))
+    horizon_days = 4 * 365  # three years of history plus one year ahead
+    today64 = np.datetime64(today)
+
+    with conn.cursor() as cur:
+        # Users: managers first, then employees each reporting to one manager.
+        managers = max(1, users // (MANAGER_RATIO + 1))
+        employees = max(1, users - managers)
+        first_user = _reserve_ids(cur, 'users', 'user_id', managers + employees)
+        manager_ids = np.arange(first_user, first_user + managers)
+        employee_ids = np.arange(first_user + managers, first_user + managers + employees)
+        employee_manager = rng.choice(manager_ids, size=employees)
+
+        user_ids = np.concatenate([manager_ids, employee_ids])
+        names = (pd.Series(rng.choice(FIRST_NAMES, size=user_ids.size)) + ' '
+                 + pd.Series(rng.choice(LAST_NAMES, size=user_ids.size)))
+        roles = np.where(np.arange(user_ids.size) < managers, 'Manager', 'Employee')
+        # Reporting lines: managers form a tree with MANAGER_RATIO reports each under the
+        # first manager; employees report to their manager. Triggers build user_hierarchy.
+        manager_parent = np.concatenate([[-1], manager_ids[(np.arange(1, managers) - 1) // MANAGER_RATIO]])
+        reports_to = pd.array(np.concatenate([manager_parent, employee_manager]), dtype='Int64')
+        reports_to[0] = pd.NA
+        _copy(cur, 'users', pd.DataFrame({'user_id': user_ids, 'name': names, 'role': roles, 'manager_id': reports_to}))
+        conn.commit()
+        print(f"users: {user_ids.size:,} ({managers:,} managers)", file=sys.stderr)
+
+        # Goals: due dates spread over the horizon, status weighted by whether they are past due.
+        first_goal = _reserve_ids(cur, 'goals', 'goal_id', goals) if goals else 0
+        goal_employee = np.empty(goals, dtype=np.int64)
+        goal_manager = np.empty(goals, dtype=np.int64)
+        started = time.monotonic()
+        for offset, n in _chunks(goals, chunk_size):
+            emp_idx = rng.integers(0, employees, size=n)
+            goal_employee[offset:offset + n] = employee_ids[emp_idx]
+            goal_manager[offset:offset + n] = employee_manager[emp_idx]
+            due = epoch + rng.integers(0, horizon_days, size=n).astype('timedelta64[D]')
+            past = due < today64
+            status = np.where(
+                past,
+                rng.choice(['Completed', 'Cancelled', 'In Progress', 'Draft'], size=n, p=[0.70, 0.10, 0.15, 0.05]),
+                rng.choice(['Draft', 'In Progress', 'Completed'], size=n, p=[0.30, 0.65, 0.05]),
+            )
+            quarter = QUARTERS[(due.astype('datetime64[M]').astype(int) % 12) // 3]
+            title = (pd.Series(quarter) + ' ' + pd.Series(rng.choice(GOAL_TITLES, size=n)))
+            df = pd.DataFrame({
+                'goal_id': np.arange(first_goal + offset, first_goal + offset + n),
+                'title': title,
+                'description': rng.choice(GOAL_DESCRIPTIONS, size=n),
+                'due_date': due.astype(str),
+                'status': status,
+                'manager_id': goal_manager[offset:offset + n],
+                'employee_id': goal_employee[offset:offset + n],
+            })
+            _copy(cur, 'goals', df)
+            conn.commit()
+            _progress('goals', offset + n, goals, started)
+
+        if goals:
+            started = time.monotonic()
+            first_task = _reserve_ids(cur, 'tasks', 'task_id', tasks) if tasks else 0
+            for offset, n in _chunks(tasks, chunk_size):
+                df = pd.DataFrame({
+                    'task_id': np.arange(first_task + offset, first_task + offset + n),
+                    'goal_id': first_goal + rng.integers(0, goals, size=n),
+                    'description': rng.choice(TASK_DESCRIPTIONS, size=n),
+                    'is_approved': rng.random(n) < 0.4,
+                })
+                _copy(cur, 'tasks', df)
+                conn.commit()
+                _progress('tasks', offset + n, tasks, started)
+
+            # Quarter partitions for the whole history, so rows do not pile up in feedback_default
+            cur.execute("SELECT ensure_feedback_partitions(%s, %s);", (today - timedelta(days=3 * 365), today))
+            conn.commit()
+            started = time.monotonic()
+            first_feedback = _reserve_ids(cur, 'feedback', 'feedback_id', feedback) if feedback else 0
+            for offset, n in _chunks(feedback, chunk_size):
+                goal_idx = rng.integers(0, goals, size=n)
+                seconds = rng.integers(0, 3 * 365 * 86400, size=n).astype('timedelta64[s]')
+                df = pd.DataFrame({
+                    'feedback_id': np.arange(first_feedback + offset, first_feedback + offset + n),
+                    'goal_id': first_goal + goal_idx,
+                    'manager_id': goal_manager[goal_idx],
+                    'employee_id': goal_employee[goal_idx],
+                    'feedback_text': rng.choice(FEEDBACK_TEXTS, size=n),
+                    'feedback_date': pd.Series(epoch.astype('datetime64[s]') + seconds).dt.strftime('%Y-%m-%d %H:%M:%S+00'),
+                })
+                _copy(cur, 'feedback', df)
+                conn.commit()
+                _progress('feedback', offset + n, feedback, started)
+
+        print("Analyzing tables...", file=sys.stderr)
+        cur.execute("ANALYZE users, goals, tasks, feedback;")
+        conn.commit()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Seed the PMS database with synthetic org-scale data.")
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--goals", type=int, default=2_000_000)
+    parser.add_argument("--tasks", type=int, default=10_000_000)
+    parser.add_argument("--feedback", type=int, default=500_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed for reproducible data")
+    args = parser.parse_args(argv)
+
+    import backend as db
+    import migrate
+
+    with db.db_connection() as conn:
+        migrate.apply_migrations(conn)
+        seed(conn, args.users, args.goals, args.tasks, args.feedback,
+             chunk_size=args.chunk_size, seed_value=args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
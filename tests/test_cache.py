@@ -0,0 +1,172 @@
+import json
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+import cache  # noqa: E402
+from cache import ALL_TAGS, ResultCache, publish_invalidation  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", fake)
+    return fake
+
+
+def test_get_returns_stored_value():
+    result_cache = ResultCache()
+    result_cache.set("key", "value", ["tasks:1"])
+    assert result_cache.get("key") == (True, "value")
+    assert result_cache.get("other") == (False, None)
+    assert result_cache.stats()['hits'] == 1
+    assert result_cache.stats()['misses'] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    result_cache = ResultCache(ttl=30)
+    result_cache.set("key", "value", [])
+    clock.now += 29
+    assert result_cache.get("key") == (True, "value")
+    clock.now += 1
+    assert result_cache.get("key") == (False, None)
+    assert result_cache.stats()['entries'] == 0
+
+
+def test_lru_evicts_least_recently_used():
+    result_cache = ResultCache(max_entries=2)
+    result_cache.set("a", 1, [])
+    result_cache.set("b", 2, [])
+    result_cache.get("a")
+    result_cache.set("c", 3, [])
+    assert result_cache.get("b") == (False, None)
+    assert result_cache.get("a") == (True, 1)
+    assert result_cache.get("c") == (True, 3)
+    assert result_cache.stats()['evictions'] == 1
+
+
+def test_invalidate_drops_only_tagged_entries():
+    result_cache = ResultCache()
+    result_cache.set("goals", 1, ["goals:Manager:1", "history:2"])
+    result_cache.set("tasks", 2, ["tasks:5"])
+    result_cache.invalidate(["history:2"])
+    assert result_cache.get("goals") == (False, None)
+    assert result_cache.get("tasks") == (True, 2)
+
+
+def test_invalidate_all_tag_clears_everything():
+    result_cache = ResultCache()
+    result_cache.set("a", 1, ["x"])
+    result_cache.set("b", 2, ["y"])
+    result_cache.invalidate([ALL_TAGS])
+    assert result_cache.stats()['entries'] == 0
+
+
+def test_replacing_an_entry_updates_its_tags():
+    result_cache = ResultCache()
+    result_cache.set("key", 1, ["old"])
+    result_cache.set("key", 2, ["new"])
+    result_cache.invalidate(["old"])
+    assert result_cache.get("key") == (True, 2)
+    result_cache.invalidate(["new"])
+    assert result_cache.get("key") == (False, None)
+
+
+def test_set_skips_value_read_before_an_invalidation():
+    result_cache = ResultCache()
+    generation = result_cache.generation()
+    result_cache.invalidate(["tasks:1"])
+    result_cache.set("key", "stale", ["tasks:1"], generation=generation)
+    assert result_cache.get("key") == (False, None)
+
+    result_cache.set("key", "fresh", ["tasks:1"], generation=result_cache.generation())
+    assert result_cache.get("key") == (True, "fresh")
+
+
+def test_cached_decorator_reads_through_and_invalidates():
+    result_cache = ResultCache()
+    calls = []
+
+    @result_cache.cached(lambda goal_id: [f"tasks:{goal_id}"])
+    def get_tasks(goal_id):
+        calls.append(goal_id)
+        return [goal_id, len(calls)]
+
+    assert get_tasks(1) == [1, 1]
+    assert get_tasks(1) == [1, 1]
+    assert get_tasks(2) == [2, 2]
+    result_cache.invalidate(["tasks:1"])
+    assert get_tasks(1) == [1, 3]
+
+
+def test_cached_decorator_does_not_store_a_result_invalidated_during_the_call():
+    result_cache = ResultCache()
+    calls = []
+
+    @result_cache.cached(lambda: ["tasks:1"])
+    def get_tasks():
+        calls.append(1)
+        if len(calls) == 1:
+            # A concurrent write commits while this read is in flight
+            result_cache.invalidate(["tasks:1"])
+        return len(calls)
+
+    assert get_tasks() == 1
+    assert get_tasks() == 2
+    assert get_tasks() == 2
+
+
+def test_cached_decorator_respects_cacheable_and_enabled():
+    result_cache = ResultCache()
+    enabled = [True]
+    calls = []
+
+    @result_cache.cached(lambda value: [], cacheable=lambda result: result is not None,
+                         enabled=lambda: enabled[0])
+    def fetch(value):
+        calls.append(value)
+        return value
+
+    fetch(None)
+    fetch(None)
+    assert len(calls) == 2
+
+    fetch(1)
+    fetch(1)
+    assert len(calls) == 3
+
+    enabled[0] = False
+    fetch(1)
+    assert len(calls) == 4
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+
+def test_publish_invalidation_sends_sorted_unique_tags():
+    cur = RecordingCursor()
+    publish_invalidation(cur, "epms_cache", ["b", "a", "b"])
+    (_, (channel, payload)), = cur.executed
+    assert channel == "epms_cache"
+    assert json.loads(payload) == ["a", "b"]
+
+
+def test_publish_invalidation_falls_back_to_all_tags_for_large_payloads():
+    cur = RecordingCursor()
+    publish_invalidation(cur, "epms_cache", [f"goals:Manager:{i}" for i in range(2000)])
+    (_, (_, payload)), = cur.executed
+    assert json.loads(payload) == [ALL_TAGS]
@@ -0,0 +1,49 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from export import EXPORT_COLUMN_TYPES, ParquetChunkWriter  # noqa: E402
+
+
+def goal_rows(rows):
+    return pd.DataFrame(rows, columns=list(EXPORT_COLUMN_TYPES['goals']))
+
+
+def test_parquet_writer_keeps_types_when_first_chunk_column_is_all_null(tmp_path):
+    path = str(tmp_path / "goals.parquet")
+    writer = ParquetChunkWriter(path, EXPORT_COLUMN_TYPES['goals'])
+    writer.write(goal_rows([
+        (1, 'Goal 1', None, None, 'Draft', None, None, 7, 'John'),
+        (2, 'Goal 2', None, None, 'Draft', None, None, 7, 'John'),
+    ]))
+    writer.write(goal_rows([
+        (3, 'Goal 3', 'Details', date(2025, 9, 30), 'Completed', 1, 'Jane', 8, 'Alice'),
+    ]))
+    writer.close()
+
+    table = pq.read_table(path)
+    assert table.schema.field('description').type == pa.string()
+    assert table.schema.field('due_date').type == pa.date32()
+    assert table.schema.field('manager_id').type == pa.int32()
+    assert table.num_rows == 3
+    assert table.column('manager_name').to_pylist() == [None, None, 'Jane']
+    assert table.column('due_date').to_pylist() == [None, None, date(2025, 9, 30)]
+
+
+def test_parquet_writer_accepts_null_ids_and_timestamps(tmp_path):
+    path = str(tmp_path / "feedback.parquet")
+    columns = list(EXPORT_COLUMN_TYPES['feedback'])
+    writer = ParquetChunkWriter(path, EXPORT_COLUMN_TYPES['feedback'])
+    written_at = datetime(2025, 7, 1, 12, 30, tzinfo=timezone.utc)
+    writer.write(pd.DataFrame([(1, None, None, 7, written_at, 'Good work')], columns=columns))
+    writer.write(pd.DataFrame([(2, 4, 1, 7, written_at, 'Keep going')], columns=columns))
+    writer.close()
+
+    table = pq.read_table(path)
+    assert table.schema.field('feedback_date').type == pa.timestamp('us', tz='UTC')
+    assert table.column('goal_id').to_pylist() == [None, 4]
+    assert table.column('manager_id').to_pylist() == [None, 1]
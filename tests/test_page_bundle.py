@@ -0,0 +1,56 @@
+import shutil
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+if shutil.which("initdb") is None or shutil.which("pg_ctl") is None:
+    pytest.skip("PostgreSQL server binaries (initdb, pg_ctl) are not on PATH", allow_module_level=True)
+
+import backend as db  # noqa: E402
+import benchmark  # noqa: E402
+import migrate  # noqa: E402
+
+USERS = [(1, 'Manager'), (2, 'Employee'), (3, 'Employee')]
+
+
+@pytest.fixture(scope="module")
+def database():
+    with benchmark.TemporaryPostgres() as cluster:
+        benchmark._use_database(cluster.port, "epms_test_bundle")
+        cache_enabled, db.CACHE_ENABLED = db.CACHE_ENABLED, False
+        today = date.today()
+        with db.db_connection() as conn:
+            migrate.apply_migrations(conn)
+            db.ensure_feedback_partitions(conn)
+            db.insert_sample_data(conn)
+            with conn.cursor() as cur:
+                cur.executemany(
+                    "INSERT INTO goals (title, due_date, status, manager_id, employee_id) VALUES (%s, %s, %s, 1, %s);",
+                    [
+                        ('Overdue', today - timedelta(days=3), 'In Progress', 2),
+                        ('Due soon', today, 'Draft', 3),
+                        ('Cancelled', today - timedelta(days=1), 'Cancelled', 3),
+                        ('No due date', None, 'Draft', 2),
+                    ]
+                )
+                # Status changes go through the summary-table triggers too
+                cur.execute("UPDATE goals SET status = 'Completed' WHERE title = 'Project A';")
+            conn.commit()
+        try:
+            yield
+        finally:
+            db.close_pool()
+            db.CACHE_ENABLED = cache_enabled
+
+
+@pytest.mark.parametrize("use_summary", [True, False])
+@pytest.mark.parametrize("user_id, role", USERS)
+def test_bundle_metrics_match_dashboard_metrics(database, monkeypatch, use_summary, user_id, role):
+    monkeypatch.setattr(db, "USE_GOAL_SUMMARY", use_summary)
+    expected = db.get_dashboard_metrics(user_id, role)
+    assert expected['total_goals'] > 0
+    assert db.get_page_bundle(user_id, role)['metrics'] == expected
@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+import psycopg2.extensions  # noqa: E402
+
+from pool import ConnectionPool, PoolTimeout  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeConnector:
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self):
+        conn = FakeConnection()
+        self.connections.append(conn)
+        return conn
+
+
+def make_pool(**kwargs):
+    connect = FakeConnector()
+    return ConnectionPool(connect, **kwargs), connect
+
+
+def test_opens_minconn_connections_up_front():
+    pool, connect = make_pool(minconn=2, maxconn=4)
+    assert len(connect.connections) == 2
+    assert pool.stats()['idle'] == 2
+
+
+def test_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        ConnectionPool(FakeConnector(), minconn=3, maxconn=2)
+
+
+def test_reuses_returned_connection():
+    pool, connect = make_pool(minconn=0, maxconn=2)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert len(connect.connections) == 1
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(minconn=0, maxconn=1)
+    pool.getconn()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waits'] == 1
+
+
+def test_checkout_blocks_until_a_connection_is_returned():
+    pool, _ = make_pool(minconn=0, maxconn=1)
+    conn = pool.getconn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn(timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    assert not got
+    pool.putconn(conn)
+    waiter.join(timeout=5)
+    assert got == [conn]
+    assert pool.stats()['waits'] == 1
+
+
+def test_putconn_rolls_back_open_transaction():
+    pool, _ = make_pool(minconn=0, maxconn=1)
+    conn = pool.getconn()
+    conn.in_transaction = True
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+
+def test_putconn_discards_connection_that_cannot_roll_back():
+    pool, _ = make_pool(minconn=0, maxconn=1)
+    conn = pool.getconn()
+    conn.in_transaction = True
+    conn.broken = True
+    pool.putconn(conn)
+    assert conn.closed
+    stats = pool.stats()
+    assert stats['idle'] == 0
+    assert stats['connections_discarded'] == 1
+
+
+def test_connection_context_discards_on_operational_error():
+    pool, connect = make_pool(minconn=0, maxconn=1)
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            raise psycopg2.OperationalError("connection lost")
+    assert conn.closed
+    assert pool.getconn() is not conn
+    assert len(connect.connections) == 2
+
+
+def test_broken_idle_connection_is_replaced_on_checkout():
+    pool, connect = make_pool(minconn=1, maxconn=1, health_check_after=0)
+    stale = connect.connections[0]
+    stale.broken = True
+    conn = pool.getconn()
+    assert conn is not stale
+    assert stale.closed
+    assert pool.stats()['health_check_failures'] == 1
+
+
+def test_closed_idle_connection_is_replaced_without_a_query():
+    pool, connect = make_pool(minconn=1, maxconn=1)
+    connect.connections[0].closed = 1
+    assert pool.getconn() is connect.connections[1]
+
+
+def test_failed_connect_releases_the_slot():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise psycopg2.OperationalError("could not connect")
+        return FakeConnection()
+
+    pool = ConnectionPool(connect, minconn=0, maxconn=1)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.getconn(timeout=0.1) is not None
+
+
+def test_closeall_refuses_further_checkouts():
+    pool, connect = make_pool(minconn=1, maxconn=1)
+    pool.closeall()
+    assert connect.connections[0].closed
+    with pytest.raises(psycopg2.pool.PoolError):
+        pool.getconn()
@@ -0,0 +1,61 @@
+"""
+View-model lookups for frontend.py widgets.
+
+Each class is built once per data fetch from the DataFrame the backend
+returns, turning selectbox `format_func` calls and id lookups into O(1)
+dictionary reads instead of a boolean-mask scan of the frame per option.
+"""
+from dataclasses import dataclass
+from typing import Dict, List
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class GoalOptions:
+    """Goal ids in display order with id -> title and id -> employee lookups."""
+    ids: List[int]
+    titles: Dict[int, str]
+    employee_ids: Dict[int, int]
+
+    @classmethod
+    def from_frame(cls, goals_df: pd.DataFrame) -> "GoalOptions":
+        if goals_df.empty:
+            return cls([], {}, {})
+        ids = [int(goal_id) for goal_id in goals_df['goal_id'].tolist()]
+        titles = dict(zip(ids, goals_df['title'].tolist()))
+        employee_ids = {}
+        if 'employee_id' in goals_df.columns:
+            employee_ids = dict(zip(ids, (int(e) for e in goals_df['employee_id'].tolist())))
+        return cls(ids, titles, employee_ids)
+
+    def title(self, goal_id: int) -> str:
+        return self.titles.get(goal_id, f"Goal {goal_id}")
+
+    def employee_id(self, goal_id: int) -> int:
+        return self.employee_ids[goal_id]
+
+
+@dataclass(frozen=True)
+class UserOptions:
+    """User ids in display order with id -> name and id -> role lookups."""
+    ids: List[int]
+    names: Dict[int, str]
+    roles: Dict[int, str]
+
+    @classmethod
+    def from_frame(cls, users_df: pd.DataFrame) -> "UserOptions":
+        if users_df.empty:
+            return cls([], {}, {})
+        ids = [int(user_id) for user_id in users_df['user_id'].tolist()]
+        names = dict(zip(ids, users_df['name'].tolist()))
+        roles = {}
+        if 'role' in users_df.columns:
+            roles = dict(zip(ids, users_df['role'].tolist()))
+        return cls(ids, names, roles)
+
+    def name(self, user_id: int) -> str:
+        return self.names.get(user_id, f"User {user_id}")
+
+    def role(self, user_id: int) -> str:
+        return self.roles[user_id]